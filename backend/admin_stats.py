@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import Table, func, select, text, true
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User, Project, RenderJob, Payment
+from monitoring import logger
+
+# Admin system stats configuration
+ADMIN_STATS_CONFIG = {
+    "ttl": int(os.getenv("ADMIN_STATS_TTL", "60")),  # Seconds a snapshot is served
+    "refresh_interval": int(os.getenv("ADMIN_STATS_REFRESH_INTERVAL", "30")),  # Background refresh, 0 disables
+    # Tables whose planner estimate exceeds this report estimated totals instead of being counted
+    "estimate_threshold": int(os.getenv("ADMIN_STATS_ESTIMATE_THRESHOLD", "1000000")),
+    # Share of an estimated table's pages read to estimate its filtered counts (active, premium, successful)
+    "estimate_sample_percent": float(os.getenv("ADMIN_STATS_ESTIMATE_SAMPLE_PERCENT", "1")),
+    "recent_limit": 5,
+    "key": "admin_stats:snapshot"
+}
+
+ESTIMATED_TABLES = ("users", "projects", "render_jobs")
+
+# The system_stats fields that become estimates when their table is estimated
+ESTIMATED_FIELDS = {
+    "users": ("total_users", "active_users", "premium_users", "free_users"),
+    "projects": ("total_projects",),
+    "render_jobs": ("total_renders", "successful_renders", "render_success_rate")
+}
+
+
+def table_estimates(db: Session) -> Dict[str, int]:
+    """Planner row estimates from pg_class; empty on databases without one, or tables never analyzed"""
+    if db.get_bind().dialect.name != "postgresql":
+        return {}
+    rows = db.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(:names)"),
+        {"names": list(ESTIMATED_TABLES)}
+    )
+    return {name: int(reltuples) for name, reltuples in rows if reltuples >= 0}
+
+
+def sampled_shares(db: Session, table: Table, conditions: Dict[str, Callable], percent: float) -> Dict[str, float]:
+    """Share of a table's rows matching each condition, from a TABLESAMPLE SYSTEM sample of its pages"""
+    sample = table.tablesample(func.system(percent))
+    row = db.execute(select(
+        func.count().label("sampled"),
+        *(func.count().filter(condition(sample.c)).label(name) for name, condition in conditions.items())
+    )).mappings().one()
+    return {name: row[name] / row["sampled"] if row["sampled"] else 0.0 for name in conditions}
+
+
+def counters_query(month_start: datetime, estimated: set):
+    """Every counted total in one statement: one FILTER aggregate per table, cross-joined single rows.
+
+    A table in estimated is not scanned at all; compute_snapshot() fills in its totals.
+    """
+    parts = [select(
+        func.coalesce(func.sum(Payment.amount).filter(Payment.status == "succeeded"), 0).label("total_revenue"),
+        func.coalesce(
+            func.sum(Payment.amount).filter(Payment.status == "succeeded", Payment.created_at >= month_start), 0
+        ).label("monthly_revenue")
+    ).subquery()]
+    if "users" not in estimated:
+        parts.append(select(
+            func.count(User.id).label("total_users"),
+            func.count(User.id).filter(User.is_active == True).label("active_users"),
+            func.count(User.id).filter(User.is_premium == True).label("premium_users")
+        ).subquery())
+    if "projects" not in estimated:
+        parts.append(select(func.count(Project.id).label("total_projects")).subquery())
+    if "render_jobs" not in estimated:
+        parts.append(select(
+            func.count(RenderJob.id).label("total_renders"),
+            func.count(RenderJob.id).filter(RenderJob.status == "completed").label("successful_renders")
+        ).subquery())
+    statement = select(*(column for part in parts for column in part.c)).select_from(parts[0])
+    for part in parts[1:]:
+        statement = statement.join(part, true())  # Each part is a single row
+    return statement
+
+
+def estimate_counters(db: Session, estimates: Dict[str, int], estimated: set, percent: float) -> Dict[str, int]:
+    """Totals of the estimated tables from the planner, and their filtered counts from a sample of the same table"""
+    counters = {}
+    if "users" in estimated:
+        shares = sampled_shares(db, User.__table__, {
+            "active_users": lambda columns: columns.is_active == True,
+            "premium_users": lambda columns: columns.is_premium == True
+        }, percent)
+        counters["total_users"] = estimates["users"]
+        counters.update({name: round(share * estimates["users"]) for name, share in shares.items()})
+    if "projects" in estimated:
+        counters["total_projects"] = estimates["projects"]
+    if "render_jobs" in estimated:
+        shares = sampled_shares(db, RenderJob.__table__, {
+            "successful_renders": lambda columns: columns.status == "completed"
+        }, percent)
+        counters["total_renders"] = estimates["render_jobs"]
+        counters["successful_renders"] = round(shares["successful_renders"] * estimates["render_jobs"])
+    return counters
+
+
+def compute_snapshot(db: Session, config: Dict[str, Any] = ADMIN_STATS_CONFIG) -> Dict[str, Any]:
+    started = time.time()
+    now = datetime.now(timezone.utc)
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    estimates = table_estimates(db)
+    estimated = {table for table, rows in estimates.items() if rows > config["estimate_threshold"]}
+    counters = dict(db.execute(counters_query(month_start, estimated)).mappings().one())
+    counters.update(estimate_counters(db, estimates, estimated, config["estimate_sample_percent"]))
+
+    limit = config["recent_limit"]
+    recent_users = db.query(User).order_by(User.id.desc()).limit(limit).all()
+    recent_projects = db.query(Project).order_by(Project.id.desc()).limit(limit).all()
+    recent_renders = db.query(RenderJob).order_by(RenderJob.created_at.desc()).limit(limit).all()
+
+    total_renders = counters["total_renders"]
+    return {
+        "system_stats": {
+            "total_users": counters["total_users"],
+            "active_users": counters["active_users"],
+            "premium_users": counters["premium_users"],
+            "free_users": counters["total_users"] - counters["premium_users"],
+            "total_projects": counters["total_projects"],
+            "total_renders": total_renders,
+            "successful_renders": counters["successful_renders"],
+            "render_success_rate": (counters["successful_renders"] / total_renders * 100) if total_renders > 0 else 0,
+            # Approximate, from Postgres planner estimates and a sample of the table
+            "estimated_fields": sorted(field for table in estimated for field in ESTIMATED_FIELDS[table])
+        },
+        "revenue": {
+            "total": counters["total_revenue"] / 100,  # Convert from cents
+            "monthly": counters["monthly_revenue"] / 100
+        },
+        "recent_activity": {
+            "users": [{"id": u.id, "username": u.username, "email": u.email, "created_at": u.created_at} for u in recent_users],
+            "projects": [{"id": p.id, "name": p.name, "status": p.status, "created_at": p.created_at} for p in recent_projects],
+            "renders": [{"id": r.id, "status": r.status, "created_at": r.created_at} for r in recent_renders]
+        },
+        "generated_at": now.isoformat(),
+        "compute_seconds": round(time.time() - started, 3)
+    }
+
+
+class AdminStatsService:
+    """Serve the admin dashboard from a short-lived snapshot, shared through Redis and refreshed in the background"""
+
+    def __init__(self, config: Dict[str, Any] = ADMIN_STATS_CONFIG):
+        self.config = config
+        self.redis = None
+        self._local: Optional[Dict[str, Any]] = None
+        self._local_at = 0.0
+        self._refresher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection (None keeps the snapshot in-process)"""
+        self.redis = redis_client
+
+    async def _read(self) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self.config["key"])
+                if raw is not None:
+                    return json.loads(raw)
+            except Exception as e:
+                logger.warning(f"Admin stats cache read failed: {str(e)}")
+        if self._local is not None and time.time() - self._local_at < self.config["ttl"]:
+            return self._local
+        return None
+
+    async def _store(self, snapshot: Dict[str, Any]):
+        snapshot = json.loads(json.dumps(snapshot, default=str))  # Same shape whether served from Redis or memory
+        self._local = snapshot
+        self._local_at = time.time()
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.config["key"], json.dumps(snapshot), ex=self.config["ttl"])
+            except Exception as e:
+                logger.warning(f"Admin stats cache write failed: {str(e)}")
+        return snapshot
+
+    def _compute(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return compute_snapshot(db, self.config)
+        finally:
+            db.close()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot off the event loop and share it"""
+        snapshot = await asyncio.to_thread(self._compute)
+        self.refreshes += 1
+        return await self._store(snapshot)
+
+    async def get_snapshot(self) -> Dict[str, Any]:
+        """The cached snapshot, computing one only when none is fresh"""
+        snapshot = await self._read()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        return await self.refresh()
+
+    async def start(self):
+        """Start refreshing the snapshot ahead of its expiry"""
+        if self.config["refresh_interval"] > 0:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.config["refresh_interval"])
+            if not await self._take_refresh_lock():
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Admin stats refresh failed: {str(e)}")
+
+    async def _take_refresh_lock(self) -> bool:
+        """Only one worker recomputes per interval; the others read its snapshot from Redis"""
+        if self.redis is None:
+            return True
+        try:
+            return bool(await self.redis.set("admin_stats:lock", "1", nx=True, ex=max(int(self.config["refresh_interval"]) - 1, 1)))
+        except Exception as e:
+            logger.warning(f"Admin stats refresh lock failed, refreshing anyway: {str(e)}")
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "refreshes": self.refreshes, "ttl": self.config["ttl"]}
+
+
+# Global instance
+admin_stats = AdminStatsService()
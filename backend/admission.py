@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from monitoring import performance_monitor
+from stripe_integration import get_ai_priority
+
+WINDOW_SECONDS = 60
+
+# Admission control configuration
+ADMISSION_CONFIG = {
+    "enabled": os.getenv("AI_ADMISSION_ENABLED", "true").lower() == "true",
+    "model_budgets": {
+        "gpt-5": {
+            "rpm": int(os.getenv("AI_GPT5_RPM", "500")),
+            "tpm": int(os.getenv("AI_GPT5_TPM", "2000000"))
+        },
+        "gpt-4.1": {
+            "rpm": int(os.getenv("AI_GPT41_RPM", "1000")),
+            "tpm": int(os.getenv("AI_GPT41_TPM", "2000000"))
+        }
+    },
+    "default_budget": {"rpm": 500, "tpm": 1000000},
+    "max_queue_size": int(os.getenv("AI_ADMISSION_MAX_QUEUE", "200")),
+    "max_wait": float(os.getenv("AI_ADMISSION_MAX_WAIT", "60")),
+    "default_output_tokens": 4000  # Reserved when a call sets no max_output_tokens
+}
+
+
+def estimate_tokens(input: Any, max_output_tokens: Optional[int] = None) -> int:
+    """Rough token reservation for a call: ~4 characters per input token plus the output allowance"""
+    return len(str(input)) // 4 + (max_output_tokens or ADMISSION_CONFIG["default_output_tokens"])
+
+
+class Reservation:
+    """Budget held by one admitted call; settled against the budget it came from, by identity"""
+
+    __slots__ = ("model", "admitted_at", "tokens", "expired")
+
+    def __init__(self, model: str, admitted_at: float, tokens: int):
+        self.model = model
+        self.admitted_at = admitted_at
+        self.tokens = tokens
+        self.expired = False  # Aged out of the window; settling it changes nothing
+
+
+class ModelBudget:
+    """Requests and tokens admitted for one model over the last minute"""
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.admitted: deque = deque()  # Reservations, oldest first
+        self.tokens_in_window = 0
+        self.waiters: List = []  # heap of (priority, sequence, future, tokens)
+
+    def _expire(self, now: float):
+        while self.admitted and self.admitted[0].admitted_at <= now - WINDOW_SECONDS:
+            reservation = self.admitted.popleft()
+            reservation.expired = True
+            self.tokens_in_window -= reservation.tokens
+
+    def has_room(self, tokens: int, now: float) -> bool:
+        self._expire(now)
+        if len(self.admitted) >= self.rpm:
+            return False
+        # A single call larger than the whole budget is let through on an empty window
+        return self.tokens_in_window + tokens <= self.tpm or not self.admitted
+
+    def admit(self, tokens: int, now: float) -> Reservation:
+        reservation = Reservation(self.model, now, tokens)
+        self.admitted.append(reservation)
+        self.tokens_in_window += tokens
+        return reservation
+
+    def seconds_until_room(self, now: float) -> float:
+        if not self.admitted:
+            return 0.0
+        return max(self.admitted[0].admitted_at + WINDOW_SECONDS - now, 0.0)
+
+
+class AdmissionController:
+    """Per-model RPM/TPM budgets with a plan-priority queue in front of upstream AI calls.
+
+    Calls that fit the budget go straight through. The rest wait in a priority queue
+    (enterprise before pro before free); once the queue is full, callers get a 429
+    with Retry-After instead of adding to upstream rate-limit errors.
+    """
+
+    def __init__(self, config: Dict[str, Any] = ADMISSION_CONFIG):
+        self.config = config
+        self.budgets: Dict[str, ModelBudget] = {}
+        self._sequence = itertools.count()
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self.wait_times: deque = deque(maxlen=1000)
+        self.rejected = 0
+
+    def _budget(self, model: str) -> ModelBudget:
+        if model not in self.budgets:
+            budget = self.config["model_budgets"].get(model, self.config["default_budget"])
+            self.budgets[model] = ModelBudget(model, budget["rpm"], budget["tpm"])
+        return self.budgets[model]
+
+    def _reject(self, budget: ModelBudget, reason: str):
+        self.rejected += 1
+        performance_monitor.record_ai_admission(0.0, rejected=True)
+        retry_after = max(int(budget.seconds_until_room(time.time())) + 1, 1)
+        raise HTTPException(
+            status_code=429,
+            detail=f"AI capacity exhausted ({reason}). Please retry shortly.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    async def acquire(self, model: str, tokens: int, plan: str = "free") -> Reservation:
+        """Wait for budget to run a call. Returns a reservation to settle once usage is known."""
+        budget = self._budget(model)
+        if not self.config["enabled"]:
+            return budget.admit(tokens, time.time())
+
+        now = time.time()
+        if not budget.waiters and budget.has_room(tokens, now):
+            self._record_wait(0.0)
+            return budget.admit(tokens, now)
+
+        if len(budget.waiters) >= self.config["max_queue_size"]:
+            self._reject(budget, "queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (get_ai_priority(plan), next(self._sequence), future, tokens)
+        heapq.heappush(budget.waiters, entry)
+        self._schedule(model)
+
+        enqueued_at = time.time()
+        try:
+            reservation = await asyncio.wait_for(asyncio.shield(future), self.config["max_wait"])
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we gave up; hand the slot back
+                self.settle(future.result(), 0)
+            else:
+                future.cancel()
+            self._reject(budget, "queue wait timed out")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.settle(future.result(), 0)
+            else:
+                future.cancel()
+            raise
+
+        self._record_wait(time.time() - enqueued_at)
+        return reservation
+
+    def try_acquire(self, model: str, tokens: int) -> Optional[Reservation]:
+        """Admit a call only if the budget has room now and nobody is queued ahead of it; never waits"""
+        budget = self._budget(model)
+        now = time.time()
+        if self.config["enabled"] and (budget.waiters or not budget.has_room(tokens, now)):
+            return None
+        return budget.admit(tokens, now)
+
+    def settle(self, reservation: Reservation, actual_tokens: int):
+        """Replace a reservation's estimate with the tokens the call actually used (0 if it failed)"""
+        if reservation.expired:
+            return
+        budget = self._budget(reservation.model)
+        budget.tokens_in_window += actual_tokens - reservation.tokens
+        reservation.tokens = actual_tokens
+        if budget.waiters:
+            # Tokens handed back may let queued calls in now rather than when the window moves
+            self._schedule(reservation.model)
+
+    def _record_wait(self, wait: float):
+        self.wait_times.append(wait)
+        performance_monitor.record_ai_admission(wait)
+
+    def _schedule(self, model: str):
+        """Admit waiters that now fit, and set a timer for when the window frees up"""
+        budget = self._budget(model)
+        now = time.time()
+
+        while budget.waiters:
+            priority, sequence, future, tokens = budget.waiters[0]
+            if future.done():
+                heapq.heappop(budget.waiters)
+                continue
+            if not budget.has_room(tokens, now):
+                break
+            heapq.heappop(budget.waiters)
+            future.set_result(budget.admit(tokens, now))
+
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+        if budget.waiters:
+            delay = max(budget.seconds_until_room(now), 0.05)
+            self._timers[model] = asyncio.get_running_loop().call_later(delay, self._schedule, model)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth per model and queue wait-time percentiles"""
+        waits = sorted(self.wait_times)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(int(len(waits) * p), len(waits) - 1)] * 1000, 2) if waits else 0.0
+
+        now = time.time()
+        models = {}
+        for model, budget in self.budgets.items():
+            budget._expire(now)
+            models[model] = {
+                "queued": len(budget.waiters),
+                "requests_last_minute": len(budget.admitted),
+                "tokens_last_minute": budget.tokens_in_window,
+                "rpm_limit": budget.rpm,
+                "tpm_limit": budget.tpm
+            }
+
+        return {
+            "models": models,
+            "queue_wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)},
+            "rejected": self.rejected
+        }
+
+
+# Global instance
+admission_controller = AdmissionController()
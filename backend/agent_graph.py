@@ -0,0 +1,261 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ai_client import ai_call
+from monitoring import logger
+
+# Agent graph configuration
+AGENT_GRAPH_CONFIG = {
+    "default_concurrency": int(os.getenv("AGENT_GRAPH_CONCURRENCY", "3")),
+    "max_concurrency": int(os.getenv("AGENT_GRAPH_MAX_CONCURRENCY", "5"))  # One per agent
+}
+
+# The specialized agents the planner assigns work to. depends_on is the default
+# hand-off order, used when the planner does not spell out dependencies itself.
+AGENT_DEFINITIONS = {
+    "script": {
+        "name": "Script Writer Agent",
+        "result_key": "script_agent",
+        "task": "script writing",
+        "keywords": ["script"],
+        "model": "gpt-4.1",  # Faster GPT model for straightforward writing
+        "reasoning": None,
+        "depends_on": []
+    },
+    "visual": {
+        "name": "Visual Designer Agent",
+        "result_key": "visual_agent",
+        "task": "visual design",
+        "keywords": ["visual", "design"],
+        "model": "gpt-5",  # Reasoning model for complex visual planning
+        "reasoning": {"effort": "medium"},
+        "depends_on": []
+    },
+    "editor": {
+        "name": "Video Editor Agent",
+        "result_key": "editor_agent",
+        "task": "video editing (timeline and effects)",
+        "keywords": ["editor", "editing"],
+        "model": "gpt-4.1",
+        "reasoning": None,
+        "depends_on": ["script", "visual"]
+    },
+    "seo": {
+        "name": "SEO Optimizer Agent",
+        "result_key": "seo_agent",
+        "task": "SEO optimization",
+        "keywords": ["seo"],
+        "model": "gpt-4.1",
+        "reasoning": None,
+        "depends_on": ["script"]
+    },
+    "qa": {
+        "name": "Quality Assurance Agent",
+        "result_key": "qa_agent",
+        "task": "quality assurance review",
+        "keywords": ["quality", "qa"],
+        "model": "gpt-5",
+        "reasoning": {"effort": "low"},
+        "depends_on": ["script", "visual", "editor", "seo"]
+    }
+}
+
+# Appended to the planner prompt so its plan can be parsed into a dependency graph
+PLANNER_GRAPH_INSTRUCTIONS = """
+End your answer with a fenced ```json block describing the execution graph, for example:
+{"agents": [{"agent": "script", "task": "...", "depends_on": []},
+            {"agent": "editor", "task": "...", "depends_on": ["script", "visual"]}]}
+Use only these agent ids: script, visual, editor, seo, qa. Only include agents the project needs.
+"""
+
+
+def _agent_id(name: str) -> Optional[str]:
+    """Map a planner-provided agent name onto one of the known agent ids"""
+    normalized = str(name).strip().lower()
+    if normalized in AGENT_DEFINITIONS:
+        return normalized
+    for agent_id, definition in AGENT_DEFINITIONS.items():
+        if any(keyword in normalized for keyword in definition["keywords"]):
+            return agent_id
+    return None
+
+
+def _dependencies(value: Any) -> List[str]:
+    """Known agent ids from a planner depends_on value: a list of names, a single name, or junk"""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [agent for agent in (_agent_id(name) for name in value if isinstance(name, str)) if agent]
+
+
+def _extract_graph_json(master_plan: str) -> Optional[Dict[str, Any]]:
+    blocks = re.findall(r"```(?:json)?\s*(\{.*?\})\s*```", master_plan or "", re.S)
+    for block in reversed(blocks):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        if isinstance(data, dict) and isinstance(data.get("agents"), list):
+            return data
+    return None
+
+
+def _has_cycle(graph: Dict[str, Dict[str, Any]]) -> bool:
+    remaining = {agent: set(node["depends_on"]) for agent, node in graph.items()}
+    while remaining:
+        ready = [agent for agent, deps in remaining.items() if not deps]
+        if not ready:
+            return True
+        for agent in ready:
+            del remaining[agent]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return False
+
+
+def parse_agent_graph(master_plan: str) -> Dict[str, Dict[str, Any]]:
+    """Build the agent dependency graph from the planner's output.
+
+    Prefers the planner's JSON graph, then agents named in the plan text, and
+    finally all five agents with their default hand-offs.
+    """
+    graph = {}
+    data = _extract_graph_json(master_plan)
+    if data:
+        for entry in data["agents"]:
+            if not isinstance(entry, dict):
+                continue
+            agent = _agent_id(entry.get("agent") or entry.get("name", ""))
+            if agent and agent not in graph:
+                graph[agent] = {
+                    "task": str(entry.get("task", "")),
+                    "depends_on": _dependencies(entry.get("depends_on"))
+                }
+
+    if not graph:
+        plan_text = (master_plan or "").lower()
+        named = [agent for agent, definition in AGENT_DEFINITIONS.items() if definition["name"].lower() in plan_text]
+        for agent in named or AGENT_DEFINITIONS.keys():
+            graph[agent] = {"task": "", "depends_on": list(AGENT_DEFINITIONS[agent]["depends_on"])}
+
+    # Drop dependencies on agents that are not part of this run
+    for agent, node in graph.items():
+        node["depends_on"] = [dep for dep in dict.fromkeys(node["depends_on"]) if dep in graph and dep != agent]
+
+    if _has_cycle(graph):
+        logger.warning("Planner produced a cyclic agent graph, using default hand-offs")
+        for agent, node in graph.items():
+            node["depends_on"] = [dep for dep in AGENT_DEFINITIONS[agent]["depends_on"] if dep in graph]
+
+    return graph
+
+
+def _agent_prompt(agent: str, node: Dict[str, Any], master_plan: str, requirements: Any, inputs: Dict[str, str]) -> str:
+    definition = AGENT_DEFINITIONS[agent]
+    prompt = f"Based on this plan: {master_plan}\n\nExecute the {definition['task']} task with these requirements: {requirements}"
+    if node["task"]:
+        prompt += f"\n\nYour assignment: {node['task']}"
+    for dependency, output in inputs.items():
+        prompt += f"\n\n### Output from {AGENT_DEFINITIONS[dependency]['name']}\n{output}"
+    return prompt
+
+
+async def execute_agent_graph(
+    graph: Dict[str, Dict[str, Any]],
+    master_plan: str,
+    requirements: Any,
+    max_concurrency: Optional[int] = None,
+    caller: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run the agents concurrently as their dependencies finish, yielding a report per agent as it completes"""
+    concurrency = max_concurrency or AGENT_GRAPH_CONFIG["default_concurrency"]
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, AGENT_GRAPH_CONFIG["max_concurrency"])))
+    outputs: Dict[str, str] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    graph_start = time.time()
+
+    async def run_node(agent: str) -> Dict[str, Any]:
+        node = graph[agent]
+        definition = AGENT_DEFINITIONS[agent]
+        report = {
+            "agent": agent,
+            "name": definition["name"],
+            "depends_on": node["depends_on"],
+            "model": definition["model"]
+        }
+
+        dependency_reports = await asyncio.gather(*(tasks[dep] for dep in node["depends_on"]))
+        failed = [dep["agent"] for dep in dependency_reports if dep["status"] != "completed"]
+        if failed:
+            return {**report, "status": "skipped", "error": f"Dependencies failed: {', '.join(failed)}"}
+
+        async with semaphore:
+            started_at = time.time()
+            try:
+                prompt = _agent_prompt(agent, node, master_plan, requirements, {dep: outputs[dep] for dep in node["depends_on"]})
+                result = await ai_call(
+                    model=definition["model"],
+                    reasoning=definition["reasoning"],
+                    input=prompt if definition["reasoning"] is None else [{"role": "developer", "content": prompt}],
+                    session_type=f"agent:{agent}",
+                    **(caller or {})
+                )
+            except Exception as e:
+                return {
+                    **report,
+                    "status": "failed",
+                    "error": str(e),
+                    "latency_ms": round((time.time() - started_at) * 1000, 2)
+                }
+
+        outputs[agent] = result["output_text"]
+        return {
+            **report,
+            "status": "completed",
+            "output": result["output_text"],
+            "latency_ms": result["latency_ms"],
+            "started_at_ms": round((started_at - graph_start) * 1000, 2),
+            "total_tokens": result["total_tokens"],
+            "reasoning_tokens": result["reasoning_tokens"],
+            "cached": result["cached"]
+        }
+
+    # Create tasks in dependency order so every node can await its parents
+    pending = dict(graph)
+    while pending:
+        for agent in [a for a, node in pending.items() if all(dep in tasks for dep in node["depends_on"])]:
+            tasks[agent] = asyncio.create_task(run_node(agent))
+            del pending[agent]
+
+    try:
+        for finished in asyncio.as_completed(list(tasks.values())):
+            yield await finished
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+def summarize_agent_graph(reports: List[Dict[str, Any]], wall_clock_ms: float) -> Dict[str, Any]:
+    """Aggregate per-agent reports: latency of the longest dependency chain versus the sum of all agents"""
+    by_agent = {report["agent"]: report for report in reports}
+    finish_ms: Dict[str, float] = {}
+
+    def path_ms(agent: str) -> float:
+        if agent not in finish_ms:
+            report = by_agent[agent]
+            upstream = max((path_ms(dep) for dep in report["depends_on"]), default=0.0)
+            finish_ms[agent] = upstream + report.get("latency_ms", 0.0)
+        return finish_ms[agent]
+
+    return {
+        "nodes": reports,
+        "wall_clock_ms": round(wall_clock_ms, 2),
+        "critical_path_ms": round(max((path_ms(agent) for agent in by_agent), default=0.0), 2),
+        "sequential_ms": round(sum(report.get("latency_ms", 0.0) for report in reports), 2),
+        "total_tokens": sum(report.get("total_tokens", 0) for report in reports)
+    }
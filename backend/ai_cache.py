@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from monitoring import performance_monitor, logger
+
+# Response cache configuration
+AI_CACHE_CONFIG = {
+    "enabled": os.getenv("AI_CACHE_ENABLED", "true").lower() == "true",
+    "ttl": int(os.getenv("AI_CACHE_TTL", "86400")),  # 24 hours
+    "max_entries": int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000")),
+    "local_max_entries": int(os.getenv("AI_CACHE_LOCAL_MAX_ENTRIES", "1000")),
+    "key_prefix": "ai_cache"
+}
+
+# Fields of an ai_call() result worth keeping
+CACHED_FIELDS = [
+    "output_text", "reasoning_summary", "response_id", "model",
+    "input_tokens", "cached_tokens", "output_tokens", "reasoning_tokens", "total_tokens"
+]
+
+
+def make_cache_key(model: str, input: Any, reasoning: Optional[Dict[str, Any]] = None, **params) -> str:
+    """Canonical hash of the model, reasoning settings and rendered prompt"""
+    payload = {
+        "model": model,
+        "reasoning": reasoning or {},
+        "input": input,
+        "params": params
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache deterministic AI responses in Redis, falling back to an in-process LRU"""
+
+    def __init__(self, config: Dict[str, Any] = AI_CACHE_CONFIG):
+        self.config = config
+        self.redis = None
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection (None keeps the in-process cache)"""
+        self.redis = redis_client
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["enabled"]
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.config['key_prefix']}:entry:{key}"
+
+    @property
+    def _lru_key(self) -> str:
+        return f"{self.config['key_prefix']}:lru"
+
+    async def get(self, key: str, record: bool = True) -> Optional[Dict[str, Any]]:
+        """Look up a cached result and record the hit or miss"""
+        value = None
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._entry_key(key))
+                if raw is not None:
+                    value = json.loads(raw)
+                    await self.redis.zadd(self._lru_key, {key: time.time()})
+            except Exception as e:
+                logger.warning(f"AI cache read failed, using local cache: {str(e)}")
+                value = self._local_get(key)
+        else:
+            value = self._local_get(key)
+
+        if record:
+            performance_monitor.record_ai_cache_lookup(value is not None)
+        return value
+
+    async def set(self, key: str, result: Dict[str, Any]):
+        """Store the cacheable fields of an ai_call() result"""
+        value = {field: result.get(field) for field in CACHED_FIELDS}
+        if self.redis is not None:
+            try:
+                await self._redis_set(key, value)
+                return
+            except Exception as e:
+                logger.warning(f"AI cache write failed, using local cache: {str(e)}")
+        self._local_set(key, value)
+
+    async def _redis_set(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.set(self._entry_key(key), json.dumps(value), ex=self.config["ttl"])
+        pipe.zadd(self._lru_key, {key: now})
+        # Entries that expired on their own no longer count towards the size bound
+        pipe.zremrangebyscore(self._lru_key, 0, now - self.config["ttl"])
+        pipe.zcard(self._lru_key)
+        size = (await pipe.execute())[-1]
+
+        overflow = size - self.config["max_entries"]
+        if overflow > 0:
+            evicted = await self.redis.zpopmin(self._lru_key, overflow)
+            if evicted:
+                await self.redis.delete(*[self._entry_key(member) for member, _ in evicted])
+
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return value
+
+    def _local_set(self, key: str, value: Dict[str, Any]):
+        self._local[key] = (time.time() + self.config["ttl"], value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.config["local_max_entries"]:
+            self._local.popitem(last=False)
+
+
+# Global instance
+response_cache = ResponseCache()
@@ -0,0 +1,352 @@
+import asyncio
+import os
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import httpx
+from openai import AsyncOpenAI
+
+from admission import admission_controller, estimate_tokens
+from ai_cache import response_cache, make_cache_key
+from single_flight import single_flight
+from usage_ledger import usage_ledger
+from monitoring import performance_monitor, logger
+from resilience import resilient_caller, RESILIENCE_CONFIG
+
+
+def _parse_model_limits(raw: str) -> Dict[str, int]:
+    """Parse "model=limit,model=limit" into a dict"""
+    limits = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        model, limit = item.split("=", 1)
+        try:
+            limits[model.strip()] = int(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid AI concurrency limit: {item}")
+    return limits
+
+
+# AI client configuration
+AI_CLIENT_CONFIG = {
+    "timeouts": {
+        "connect": float(os.getenv("AI_CONNECT_TIMEOUT", "10")),
+        "read": float(os.getenv("AI_READ_TIMEOUT", "180")),  # gpt-5 at high effort can take minutes
+        "write": float(os.getenv("AI_WRITE_TIMEOUT", "30")),
+        "pool": float(os.getenv("AI_POOL_TIMEOUT", "30"))
+    },
+    "pool": {
+        "max_connections": int(os.getenv("AI_MAX_CONNECTIONS", "100")),
+        "max_keepalive_connections": int(os.getenv("AI_MAX_KEEPALIVE", "20")),
+        "keepalive_expiry": float(os.getenv("AI_KEEPALIVE_EXPIRY", "30"))
+    },
+    "max_retries": int(os.getenv("AI_MAX_RETRIES", "0")),  # Retries are handled by resilience.py
+    "default_concurrency": int(os.getenv("AI_DEFAULT_CONCURRENCY", "16")),
+    "model_concurrency": {
+        "gpt-5": 32,
+        "gpt-4.1": 64,
+        **_parse_model_limits(os.getenv("AI_MODEL_CONCURRENCY", ""))
+    }
+}
+
+
+def extract_reasoning_summary(response) -> str:
+    """Join the reasoning summary parts of a Responses API result"""
+    parts = []
+    for output in getattr(response, "output", None) or []:
+        if output.type == "reasoning" and getattr(output, "summary", None):
+            parts.extend(part.text for part in output.summary)
+    return "\n\n".join(parts)
+
+
+def extract_usage(usage) -> Dict[str, int]:
+    """Normalize a Responses API usage object into plain counters"""
+    if usage is None:
+        return {"input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "reasoning_tokens": 0, "total_tokens": 0}
+
+    input_details = getattr(usage, "input_tokens_details", None)
+    output_details = getattr(usage, "output_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "cached_tokens": getattr(input_details, "cached_tokens", 0) or 0,  # Served from the upstream prompt cache
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "reasoning_tokens": getattr(output_details, "reasoning_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0
+    }
+
+
+class AIClient:
+    """Shared async OpenAI client with a pooled transport and per-model concurrency limits"""
+
+    def __init__(self, config: Dict[str, Any] = AI_CLIENT_CONFIG):
+        self.config = config
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Lazily build the AsyncOpenAI client so it binds to the running event loop"""
+        if self._client is None:
+            timeouts = self.config["timeouts"]
+            pool = self.config["pool"]
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    connect=timeouts["connect"],
+                    read=timeouts["read"],
+                    write=timeouts["write"],
+                    pool=timeouts["pool"]
+                ),
+                limits=httpx.Limits(
+                    max_connections=pool["max_connections"],
+                    max_keepalive_connections=pool["max_keepalive_connections"],
+                    keepalive_expiry=pool["keepalive_expiry"]
+                )
+            )
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=self._http_client,
+                max_retries=self.config["max_retries"]
+            )
+        return self._client
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            limit = self.config["model_concurrency"].get(model, self.config["default_concurrency"])
+            self._semaphores[model] = asyncio.Semaphore(limit)
+        return self._semaphores[model]
+
+    async def create_response(self, model: str, **kwargs):
+        """Call the Responses API, waiting for a free slot for the model"""
+        async with self._semaphore(model):
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            try:
+                return await self.client.responses.create(model=model, **kwargs)
+            finally:
+                self._in_flight[model] -= 1
+
+    async def stream_response(self, model: str, **kwargs) -> AsyncIterator[Any]:
+        """Stream Responses API events, holding the model's slot until the stream ends.
+
+        The upstream response is closed however the consumer stops, so an abandoned
+        stream hands its pooled connection back instead of leaking it.
+        """
+        async with self._semaphore(model):
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            try:
+                stream = await self.client.responses.create(model=model, stream=True, **kwargs)
+                async with stream:
+                    async for event in stream:
+                        yield event
+            finally:
+                self._in_flight[model] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current in-flight calls per model"""
+        return {
+            model: {
+                "in_flight": self._in_flight.get(model, 0),
+                "limit": self.config["model_concurrency"].get(model, self.config["default_concurrency"])
+            }
+            for model in self._semaphores
+        }
+
+    async def close(self):
+        """Close the pooled HTTP transport"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+
+
+# Global instance
+ai_client = AIClient()
+
+
+async def ai_call(
+    model: str,
+    input: Union[str, List[Dict[str, Any]]],
+    reasoning: Optional[Dict[str, Any]] = None,
+    max_output_tokens: Optional[int] = None,
+    cache: bool = False,
+    plan: str = "free",
+    user_id: Optional[int] = None,
+    session_type: str = "reasoning",
+    **kwargs
+) -> Dict[str, Any]:
+    """Single entry point for AI calls. Returns the output text, reasoning summary and token usage.
+
+    With cache=True, which endpoints with deterministic prompts opt into, identical prompts
+    are served from the response cache. Identical calls already in flight are awaited
+    instead of being sent again, cached or not.
+    Calls that do reach upstream are admitted in order of the caller's plan and
+    recorded in the usage ledger against user_id.
+    """
+    caller = {"plan": plan, "user_id": user_id, "session_type": session_type}
+    params = dict(kwargs)
+    if reasoning:
+        params["reasoning"] = reasoning
+    if max_output_tokens:
+        params["max_output_tokens"] = max_output_tokens
+
+    key = make_cache_key(model, input, **params)
+    cache = cache and response_cache.enabled
+    if cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return {**cached, "latency_ms": 0.0, "cached": True}
+
+    # Identical calls in flight are coalesced whether or not their result is cached
+    result, shared = await single_flight.do(
+        key,
+        lambda: _call_upstream(model, input, params, key if cache else None, caller),
+        lookup=(lambda: response_cache.get(key, record=False)) if cache else None
+    )
+    if shared:
+        return {**result, "coalesced": True}
+    return result
+
+
+async def _call_upstream(
+    model: str,
+    input,
+    params: Dict[str, Any],
+    cache_key: Optional[str] = None,
+    caller: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    caller = caller or {}
+    tokens = estimate_tokens(input, params.get("max_output_tokens"))
+    reservation = await admission_controller.acquire(model, tokens, caller.get("plan", "free"))
+    try:
+        # Low-effort calls are quick enough that a duplicate at the p95 is worth sending
+        effort = (params.get("reasoning") or {}).get("effort", "none")
+        start_time = time.time()
+        response = await resilient_caller.call(
+            model,
+            lambda: _attempt(model, input, params, caller, reservation),
+            hedge=(lambda: _hedge(model, input, params, caller, tokens)) if effort in RESILIENCE_CONFIG["hedge_efforts"] else None
+        )
+        latency = time.time() - start_time
+    except BaseException:
+        # Nothing answered; an attempt still running in the background settles its own usage
+        admission_controller.settle(reservation, 0)
+        raise
+
+    result = {
+        "output_text": response.output_text,
+        "reasoning_summary": extract_reasoning_summary(response),
+        "response_id": response.id,
+        "model": model,
+        "latency_ms": round(latency * 1000, 2),
+        "cached": False,
+        **extract_usage(response.usage)
+    }
+
+    # Only complete answers are worth replaying
+    if cache_key and result["output_text"] and getattr(response, "status", "completed") == "completed":
+        await response_cache.set(cache_key, result)
+
+    return result
+
+
+async def _attempt(model: str, input, params: Dict[str, Any], caller: Dict[str, Any], reservation):
+    """One upstream request: settles the reservation with what it used and records it in the ledger"""
+    start_time = time.time()
+    try:
+        response = await ai_client.create_response(model, input=input, **params)
+    except BaseException:
+        admission_controller.settle(reservation, 0)
+        raise
+    latency = time.time() - start_time
+
+    usage = extract_usage(response.usage)
+    admission_controller.settle(reservation, usage["total_tokens"])
+    performance_monitor.record_ai_call(
+        model, usage["total_tokens"],
+        input_tokens=usage["input_tokens"], cached_tokens=usage["cached_tokens"], latency=latency
+    )
+    usage_ledger.record(
+        model, usage, latency_ms=round(latency * 1000, 2), response_id=response.id,
+        user_id=caller.get("user_id"), session_type=caller.get("session_type", "reasoning")
+    )
+    return response
+
+
+def _hedge(model: str, input, params: Dict[str, Any], caller: Dict[str, Any], tokens: int):
+    """Start a hedge's duplicate request if the model's budget has room for it now, else None"""
+    reservation = admission_controller.try_acquire(model, tokens)
+    if reservation is None:
+        return None
+    return _attempt(model, input, params, caller, reservation)
+
+
+async def ai_stream(
+    model: str,
+    input: Union[str, List[Dict[str, Any]]],
+    reasoning: Optional[Dict[str, Any]] = None,
+    max_output_tokens: Optional[int] = None,
+    plan: str = "free",
+    user_id: Optional[int] = None,
+    session_type: str = "reasoning",
+    **kwargs
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Streaming counterpart of ai_call(). Yields (event, data) pairs: "admitted" once the call
+    has model capacity, "reasoning" and "output" deltas as the model produces them, then a
+    final "usage" event (or "error").
+    """
+    params = dict(kwargs)
+    if reasoning:
+        params["reasoning"] = reasoning
+    if max_output_tokens:
+        params["max_output_tokens"] = max_output_tokens
+
+    queued_at = time.time()
+    reservation = await admission_controller.acquire(model, estimate_tokens(input, max_output_tokens), plan)
+    settled = False
+    try:
+        yield "admitted", {"queue_wait_ms": round((time.time() - queued_at) * 1000, 2)}
+
+        start_time = time.time()
+        first_token_at = None
+        async with aclosing(resilient_caller.stream(model, lambda: ai_client.stream_response(model, input=input, **params))) as events:
+            async for event in events:
+                if event.type in ("response.reasoning_summary_text.delta", "response.output_text.delta") and first_token_at is None:
+                    first_token_at = time.time()
+
+                if event.type == "response.reasoning_summary_text.delta":
+                    yield "reasoning", {"delta": event.delta}
+                elif event.type == "response.output_text.delta":
+                    yield "output", {"delta": event.delta}
+                elif event.type in ("response.completed", "response.incomplete"):
+                    latency = time.time() - start_time
+                    first_token = (first_token_at - start_time) if first_token_at else None
+                    usage = extract_usage(event.response.usage)
+                    admission_controller.settle(reservation, usage["total_tokens"])
+                    settled = True
+                    performance_monitor.record_ai_call(
+                        model, usage["total_tokens"],
+                        input_tokens=usage["input_tokens"], cached_tokens=usage["cached_tokens"],
+                        latency=latency, first_token=first_token
+                    )
+                    usage_ledger.record(
+                        model, usage, latency_ms=round(latency * 1000, 2), response_id=event.response.id,
+                        user_id=user_id, session_type=session_type
+                    )
+                    yield "usage", {
+                        "response_id": event.response.id,
+                        "model": model,
+                        "status": event.response.status,
+                        "latency_ms": round(latency * 1000, 2),
+                        "first_token_ms": round(first_token * 1000, 2) if first_token is not None else None,
+                        **usage
+                    }
+                elif event.type in ("response.failed", "error"):
+                    error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", None)
+                    yield "error", {"type": event.type, "message": str(error) if error else event.type}
+    finally:
+        if not settled:
+            # Failed or abandoned before reporting usage
+            admission_controller.settle(reservation, 0)
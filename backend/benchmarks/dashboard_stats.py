@@ -0,0 +1,159 @@
+"""Latency of /api/dashboard/analytics' data access for a heavy user: loading every row
+and counting in Python (the original handler), the SQL aggregate query, and the
+user_stats rollup's primary-key lookup (the current handler).
+
+Seeds one user with --render-jobs render jobs (100k by default), AI sessions carrying
+request/response JSON, and projects, then times both approaches:
+
+    DATABASE_URL=postgresql://... python benchmarks/dashboard_stats.py --render-jobs 100000 --runs 20
+
+Pass --cleanup to delete the seeded user's rows afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select
+
+from database import (
+    SessionLocal, AsyncSessionLocal, async_engine, create_tables, User, Project, RenderJob, AISession,
+    count_user_stats, get_user_stats_async
+)
+from run_benchmark import percentile
+
+SEED_CHUNK = 5000
+STATUSES = ["completed", "completed", "completed", "failed", "processing"]
+
+
+def seed(render_jobs: int, ai_sessions: int, projects: int) -> int:
+    """Create one user holding the given number of rows; returns the user id"""
+    run_id = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        user = User(email=f"heavy-{run_id}@example.com", username=f"heavy_{run_id}", hashed_password="x")
+        db.add(user)
+        db.commit()
+
+        db.execute(insert(Project), [
+            {"name": f"Project {n}", "status": ["draft", "in_progress", "completed"][n % 3], "owner_id": user.id}
+            for n in range(projects)
+        ])
+        for start in range(0, render_jobs, SEED_CHUNK):
+            db.execute(insert(RenderJob), [
+                {"id": str(uuid.uuid4()), "status": STATUSES[n % len(STATUSES)], "user_id": user.id, "duration": 60.0}
+                for n in range(start, min(start + SEED_CHUNK, render_jobs))
+            ])
+        blob = {"input": "x" * 2000, "output": "y" * 4000}
+        for start in range(0, ai_sessions, SEED_CHUNK):
+            db.execute(insert(AISession), [
+                {
+                    "id": str(uuid.uuid4()), "session_type": "reasoning", "model_used": "gpt-5",
+                    "tokens_used": 1500, "request_data": blob, "response_data": blob, "user_id": user.id
+                }
+                for _ in range(start, min(start + SEED_CHUNK, ai_sessions))
+            ])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def cleanup(user_id: int):
+    db = SessionLocal()
+    try:
+        for model, column in ((AISession, AISession.user_id), (RenderJob, RenderJob.user_id), (Project, Project.owner_id)):
+            db.execute(delete(model).where(column == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def row_loading_stats(user_id: int) -> Dict[str, Any]:
+    """What the handler did before: load every row, count in Python"""
+    async with AsyncSessionLocal() as db:
+        projects = (await db.execute(select(Project).where(Project.owner_id == user_id).limit(100))).scalars().all()
+        render_jobs = (await db.execute(select(RenderJob).where(RenderJob.user_id == user_id))).scalars().all()
+        ai_sessions = (await db.execute(select(AISession).where(AISession.user_id == user_id))).scalars().all()
+        return {
+            "total_projects": len(projects),
+            "completed_projects": len([p for p in projects if p.status == "completed"]),
+            "in_progress_projects": len([p for p in projects if p.status == "in_progress"]),
+            "total_renders": len(render_jobs),
+            "successful_renders": len([r for r in render_jobs if r.status == "completed"]),
+            "total_ai_calls": len(ai_sessions),
+            "total_tokens_used": sum(s.tokens_used for s in ai_sessions)
+        }
+
+
+async def aggregate_stats(user_id: int) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        return (await db.run_sync(count_user_stats, [user_id]))[user_id]
+
+
+async def rollup_stats(user_id: int) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        return await get_user_stats_async(db, user_id)
+
+
+async def measure(fn, user_id: int, runs: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await fn(user_id)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "result": result
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Dashboard analytics latency for a heavy user")
+    parser.add_argument("--render-jobs", type=int, default=100_000)
+    parser.add_argument("--ai-sessions", type=int, default=10_000)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--user-id", type=int, help="Reuse a previously seeded user instead of seeding")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded rows afterwards")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    create_tables()
+    user_id = args.user_id
+    if user_id is None:
+        started = time.perf_counter()
+        user_id = seed(args.render_jobs, args.ai_sessions, args.projects)
+        print(f"Seeded user {user_id} in {time.perf_counter() - started:.1f}s")
+
+    try:
+        report = {
+            "row_loading": await measure(row_loading_stats, user_id, args.runs),
+            "aggregate": await measure(aggregate_stats, user_id, args.runs),
+            "rollup": await measure(rollup_stats, user_id, args.runs)  # First run seeds the row
+        }
+        print(f"{'approach':<14}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}  result")
+        for name, row in report.items():
+            print(f"{name:<14}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['max_ms']:>10}  {row['result']}")
+
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump({"config": vars(args), "user_id": user_id, "results": report}, f, indent=2)
+    finally:
+        if args.cleanup:
+            cleanup(user_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
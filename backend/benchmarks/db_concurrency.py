@@ -0,0 +1,124 @@
+"""Compare concurrent throughput of the sync and async database paths inside one event loop.
+
+Each simulated request looks up a user and lists their projects, the way GET /api/projects
+does. With --slow-ms, one extra task keeps running a slow query (pg_sleep), standing in for
+a heavy admin query. On the sync path every query blocks the loop, so that one query stalls
+every other request; on the async path the other requests keep going.
+
+    DATABASE_URL=postgresql://... python benchmarks/db_concurrency.py --concurrency 1,16,64 --slow-ms 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+
+from database import (
+    SessionLocal, AsyncSessionLocal, async_engine, User, get_user_projects, get_user_projects_async, get_user_by_id_async
+)
+from run_benchmark import percentile
+
+
+def sync_request(user_id: int):
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user_id).first()
+        get_user_projects(db, user_id)
+    finally:
+        db.close()
+
+
+async def async_request(user_id: int):
+    async with AsyncSessionLocal() as db:
+        await get_user_by_id_async(db, user_id)
+        await get_user_projects_async(db, user_id)
+
+
+async def slow_queries(mode: str, slow_ms: float, stop: asyncio.Event):
+    """Keep one slow query running until the measurement ends"""
+    statement = text("SELECT pg_sleep(:seconds)").bindparams(seconds=slow_ms / 1000)
+    while not stop.is_set():
+        if mode == "sync":
+            db = SessionLocal()
+            try:
+                db.execute(statement)
+            finally:
+                db.close()
+            await asyncio.sleep(0)  # Let the loop run between blocking queries
+        else:
+            async with AsyncSessionLocal() as db:
+                await db.execute(statement)
+
+
+async def run(mode: str, user_ids: List[int], concurrency: int, duration: float, slow_ms: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+    stop = asyncio.Event()
+
+    async def worker(worker_number: int):
+        n = worker_number
+        while time.perf_counter() < deadline:
+            user_id = user_ids[n % len(user_ids)]
+            n += concurrency
+            started = time.perf_counter()
+            if mode == "sync":
+                # What an async def handler calling the sync Session does
+                sync_request(user_id)
+                await asyncio.sleep(0)
+            else:
+                await async_request(user_id)
+            latencies.append(time.perf_counter() - started)
+
+    slow = asyncio.ensure_future(slow_queries(mode, slow_ms, stop)) if slow_ms > 0 else None
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    if slow is not None:
+        await slow
+
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Sync vs async database path throughput")
+    parser.add_argument("--concurrency", default="1,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--slow-ms", type=float, default=0.0, help="Also keep a query of this many ms running")
+    parser.add_argument("--users", type=int, default=50, help="Existing users to spread requests across")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        user_ids = list((await db.execute(select(User.id).limit(args.users))).scalars())
+    if not user_ids:
+        parser.error("No users in the database; run run_benchmark.py once to register some")
+
+    report = {}
+    print(f"{'mode':<8}{'concurrency':>12}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        for mode in ("sync", "async"):
+            row = await run(mode, user_ids, concurrency, args.duration, args.slow_ms)
+            report[f"{mode}@{concurrency}"] = row
+            print(f"{mode:<8}{concurrency:>12}{row['requests']:>10}{row['rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": report}, f, indent=2)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""Check with EXPLAIN that the hot query paths are served by their indexes (Postgres only).
+
+Each path is planned with sequential scans disabled, so on a small or empty database the
+check shows that a usable index exists rather than what the planner prefers for tiny tables.
+Pass --planner to keep the planner's own choice, on a database with production-sized data.
+Exits non-zero if any path scans its table sequentially. tests/test_explain_indexes.py runs
+the same checks under pytest on a freshly migrated database.
+
+    DATABASE_URL=postgresql://... python benchmarks/explain_indexes.py
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from database import (
+    engine, User, Project, RenderJob, AISession, Payment, SupportTicket, ContentReport, ContentFlag,
+    render_stats_by_user, ai_stats_by_user
+)
+from pagination import Keyset, encode_cursor
+
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def query_paths() -> Dict[str, Any]:
+    """(table, statement) for each hot path, named after the code that issues it"""
+    now = datetime.now(timezone.utc)
+    cursor = encode_cursor(now - timedelta(days=1), 1000, "next")
+    return {
+        "get_user_projects": ("projects", select(Project).where(Project.owner_id == 1).limit(100)),
+        "render_stats_by_user": ("render_jobs", render_stats_by_user().where(RenderJob.user_id == 1)),
+        "ai_stats_by_user": ("ai_sessions", ai_stats_by_user().where(AISession.user_id == 1)),
+        "user payments": ("payments", select(Payment).where(Payment.user_id == 1)),
+        "admin monthly revenue": ("payments", select(func.sum(Payment.amount)).where(
+            Payment.status == "succeeded", Payment.created_at >= now.replace(day=1)
+        )),
+        "get_user_tickets": ("support_tickets", select(SupportTicket).where(SupportTicket.user_id == 1)
+                             .order_by(SupportTicket.created_at.desc()).limit(20)),
+        "admin tickets by status": ("support_tickets", Keyset(SupportTicket, 50, cursor).apply(
+            select(SupportTicket).where(SupportTicket.status == "open")
+        )),
+        "admin reports by status": ("content_reports", Keyset(ContentReport, 50, cursor).apply(
+            select(ContentReport).where(ContentReport.status == "pending")
+        )),
+        "admin reports by severity": ("content_reports", Keyset(ContentReport, 50, cursor).apply(
+            select(ContentReport).where(ContentReport.severity == "high")
+        )),
+        "active flags for content": ("content_flags", select(ContentFlag.content_id).where(
+            ContentFlag.content_type == "project", ContentFlag.content_id.in_([1, 2, 3]), ContentFlag.status == "active"
+        )),
+        "admin users page": ("users", Keyset(User, 50, cursor).apply(select(User)))
+    }
+
+
+def plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(connection, statement) -> List[Dict[str, Any]]:
+    compiled = statement.compile(dialect=postgresql.psycopg2.dialect(), compile_kwargs={"render_postcompile": True})
+    result = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    plan = result if isinstance(result, list) else json.loads(result)
+    return list(plan_nodes(plan[0]["Plan"]))
+
+
+def check_path(connection, table: str, statement) -> Tuple[List[str], bool, List[Dict[str, Any]]]:
+    """Indexes the plan scans, whether it scans table sequentially, and the scan nodes"""
+    scans = [node for node in explain(connection, statement) if node.get("Relation Name") == table or "Index Name" in node]
+    indexes = sorted({node["Index Name"] for node in scans if node["Node Type"] in INDEX_SCANS})
+    sequential = any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") == table for node in scans)
+    return indexes, sequential, scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot query paths and check they use indexes")
+    parser.add_argument("--planner", action="store_true", help="Do not disable sequential scans")
+    parser.add_argument("--verbose", action="store_true", help="Print each path's scan nodes")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("EXPLAIN checks need a Postgres DATABASE_URL")
+
+    failures = 0
+    with engine.connect() as connection:
+        if not args.planner:
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        for name, (table, statement) in query_paths().items():
+            indexes, sequential, scans = check_path(connection, table, statement)
+            ok = bool(indexes) and not sequential
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name:<28} {table:<16} {', '.join(indexes) or 'sequential scan'}")
+            if args.verbose:
+                for node in scans:
+                    print(f"       {node['Node Type']} {node.get('Index Name', '')}")
+        connection.rollback()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Drive the FastAPI app through realistic scenarios and report latency percentiles and throughput.
+
+Start the stand-in services and the app first (see standin_server.py), with
+RATE_LIMITS_ENABLED=false on the app so the per-client limits do not cap the run:
+
+    python benchmarks/run_benchmark.py --scenarios login,projects,reasoning,webhook --concurrency 50 --duration 30
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+BENCHMARK_CONFIG = {
+    "base_url": os.getenv("BENCH_BASE_URL", "http://localhost:8000"),
+    "webhook_secret": os.getenv("STRIPE_WEBHOOK_SECRET", ""),
+    "password": "Bench!pass123",
+    "timeout": 300.0
+}
+
+Scenario = Callable[[httpx.AsyncClient, Dict[str, Any]], Awaitable[Tuple[str, httpx.Response]]]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+class Results:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+
+    def record(self, endpoint: str, latency: float, status: int):
+        self.latencies.setdefault(endpoint, []).append(latency)
+        self.statuses.setdefault(endpoint, {})
+        self.statuses[endpoint][status] = self.statuses[endpoint].get(status, 0) + 1
+        if status >= 400 or status == 0:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        return {
+            endpoint: {
+                "requests": len(latencies),
+                "errors": self.errors.get(endpoint, 0),
+                "statuses": self.statuses[endpoint],
+                "rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+            }
+            for endpoint, latencies in self.latencies.items()
+        }
+
+
+def sign_webhook(payload: str, secret: str) -> str:
+    """Build a Stripe-Signature header the app's verify_webhook_signature accepts"""
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+async def login(client: httpx.AsyncClient, user: Dict[str, Any]):
+    response = await client.post("/api/auth/login", json={"email": user["email"], "password": BENCHMARK_CONFIG["password"]})
+    return "POST /api/auth/login", response
+
+
+async def list_projects(client: httpx.AsyncClient, user: Dict[str, Any]):
+    response = await client.get("/api/projects", headers={"Authorization": f"Bearer {user['token']}"})
+    return "GET /api/projects", response
+
+
+async def dashboard(client: httpx.AsyncClient, user: Dict[str, Any]):
+    response = await client.get("/api/dashboard/analytics", headers={"Authorization": f"Bearer {user['token']}"})
+    return "GET /api/dashboard/analytics", response
+
+
+async def tickets(client: httpx.AsyncClient, user: Dict[str, Any]):
+    response = await client.get("/api/support/tickets", headers={"Authorization": f"Bearer {user['token']}"})
+    return "GET /api/support/tickets", response
+
+
+def reasoning_scenario(unique_ratio: float) -> Scenario:
+    """Content evaluation where a share of prompts repeat, so caching and coalescing are exercised"""
+    async def reasoning(client: httpx.AsyncClient, user: Dict[str, Any]):
+        content_id = uuid.uuid4().hex if random.random() < unique_ratio else str(random.randint(0, 20))
+        response = await client.post(
+            "/api/reasoning/evaluate-content",
+            headers={"Authorization": f"Bearer {user['token']}"},
+            json={"content": f"Benchmark script {content_id}: a two minute product walkthrough.", "platform": "YouTube"}
+        )
+        return "POST /api/reasoning/evaluate-content", response
+    return reasoning
+
+
+async def webhook(client: httpx.AsyncClient, user: Dict[str, Any]):
+    event_type = random.choice(["invoice.payment_succeeded", "customer.subscription.updated", "invoice.upcoming"])
+    payload = json.dumps({
+        "id": f"evt_{uuid.uuid4().hex[:14]}",
+        "object": "event",
+        "type": event_type,
+        "data": {"object": {
+            "id": f"sub_{uuid.uuid4().hex[:14]}",
+            "customer": f"cus_bench_{random.randint(0, 1000)}",
+            "status": "active",
+            "amount_paid": 2900,
+            "amount_due": 2900,
+            "items": {"data": [{"price": {"id": "price_bench"}}]}
+        }}
+    })
+    response = await client.post(
+        "/api/stripe-webhook",
+        content=payload,
+        headers={"stripe-signature": sign_webhook(payload, BENCHMARK_CONFIG["webhook_secret"]), "Content-Type": "application/json"}
+    )
+    return "POST /api/stripe-webhook", response
+
+
+async def create_users(client: httpx.AsyncClient, count: int) -> List[Dict[str, Any]]:
+    """Register the accounts the scenarios log in as"""
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    for n in range(count):
+        email = f"bench-{run_id}-{n}@example.com"
+        response = await client.post("/api/auth/register", json={
+            "email": email,
+            "username": f"bench_{run_id}_{n}",
+            "password": BENCHMARK_CONFIG["password"],
+            "full_name": f"Benchmark User {n}"
+        })
+        response.raise_for_status()
+        users.append({"email": email, "token": response.json()["access_token"]})
+    return users
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    users: List[Dict[str, Any]],
+    concurrency: int,
+    duration: float
+) -> Tuple[Results, float]:
+    results = Results()
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_number: int):
+        n = worker_number
+        while time.perf_counter() < deadline:
+            user = users[n % len(users)]
+            n += concurrency
+            started = time.perf_counter()
+            try:
+                endpoint, response = await scenario(client, user)
+                results.record(endpoint, time.perf_counter() - started, response.status_code)
+            except httpx.HTTPError as e:
+                results.record(f"{scenario.__name__} ({type(e).__name__})", time.perf_counter() - started, 0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def print_report(name: str, summary: Dict[str, Dict[str, Any]]):
+    print(f"\n== {name} ==")
+    print(f"{'endpoint':<42}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, row in summary.items():
+        print(f"{endpoint:<42}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="FilmFusion backend load benchmark")
+    parser.add_argument("--base-url", default=BENCHMARK_CONFIG["base_url"])
+    parser.add_argument("--scenarios", default="login,projects,dashboard,tickets,reasoning,webhook")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per scenario")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--reasoning-unique", type=float, default=0.5, help="Share of reasoning prompts that are unique")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    scenarios: Dict[str, Scenario] = {
+        "login": login,
+        "projects": list_projects,
+        "dashboard": dashboard,
+        "tickets": tickets,
+        "reasoning": reasoning_scenario(args.reasoning_unique),
+        "webhook": webhook
+    }
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=BENCHMARK_CONFIG["timeout"], limits=limits) as client:
+        users = await create_users(client, args.users)
+
+        report = {}
+        for name in args.scenarios.split(","):
+            name = name.strip()
+            if name not in scenarios:
+                parser.error(f"Unknown scenario: {name}")
+            results, elapsed = await run_scenario(client, scenarios[name], users, args.concurrency, args.duration)
+            report[name] = results.summary(elapsed)
+            print_report(name, report[name])
+
+        metrics = await client.get("/metrics")
+        if metrics.status_code == 200:
+            report["server_metrics"] = metrics.json()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,271 @@
+"""Offline stand-in for the OpenAI, Stripe and Resend APIs the backend calls.
+
+Run it, point the backend at it, and load-test without spending API credit:
+
+    python benchmarks/standin_server.py  # listens on :9100
+
+    OPENAI_BASE_URL=http://localhost:9100/v1 OPENAI_API_KEY=standin \\
+    STRIPE_API_BASE=http://localhost:9100 STRIPE_SECRET_KEY=sk_test_standin \\
+    RESEND_API_URL=http://localhost:9100 RESEND_API_KEY=re_standin \\
+    uvicorn main:app --port 8000
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Stand-in behaviour, all configurable from the environment
+STANDIN_CONFIG = {
+    "port": int(os.getenv("STANDIN_PORT", "9100")),
+    "latency_ms": float(os.getenv("STANDIN_LATENCY_MS", "800")),  # Time before the first output token
+    "token_ms": float(os.getenv("STANDIN_TOKEN_MS", "2")),  # Added per output token
+    "jitter": float(os.getenv("STANDIN_JITTER", "0.2")),  # +/- fraction applied to every delay
+    "output_tokens": int(os.getenv("STANDIN_OUTPUT_TOKENS", "400")),
+    "reasoning_tokens": int(os.getenv("STANDIN_REASONING_TOKENS", "1200")),
+    "cached_ratio": float(os.getenv("STANDIN_CACHED_RATIO", "0.0")),  # Share of input tokens reported as cached
+    "error_rate": float(os.getenv("STANDIN_ERROR_RATE", "0.0")),
+    "error_status": int(os.getenv("STANDIN_ERROR_STATUS", "500")),
+    "moderation_latency_ms": float(os.getenv("STANDIN_MODERATION_LATENCY_MS", "150")),
+    "flag_rate": float(os.getenv("STANDIN_FLAG_RATE", "0.05")),
+    "stripe_latency_ms": float(os.getenv("STANDIN_STRIPE_LATENCY_MS", "250")),
+    "email_latency_ms": float(os.getenv("STANDIN_EMAIL_LATENCY_MS", "200"))
+}
+
+MODERATION_CATEGORIES = [
+    "harassment", "harassment/threatening", "hate", "hate/threatening", "self-harm",
+    "self-harm/instructions", "self-harm/intent", "sexual", "sexual/minors",
+    "violence", "violence/graphic"
+]
+
+STRIPE_OBJECTS = {
+    "customers": ("customer", "cus"),
+    "checkout/sessions": ("checkout.session", "cs_test"),
+    "billing_portal/sessions": ("billing_portal.session", "bps"),
+    "invoiceitems": ("invoiceitem", "ii"),
+    "invoices": ("invoice", "in"),
+    "subscriptions": ("subscription", "sub")
+}
+
+app = FastAPI(title="FilmFusion stand-in services")
+
+stats: Dict[str, int] = {}
+
+
+def _delay(ms: float) -> float:
+    jitter = STANDIN_CONFIG["jitter"]
+    return max(ms * random.uniform(1 - jitter, 1 + jitter), 0) / 1000
+
+
+def _count(endpoint: str):
+    stats[endpoint] = stats.get(endpoint, 0) + 1
+
+
+def _injected_error():
+    """Fail a configurable share of calls, shaped like an OpenAI error"""
+    if random.random() >= STANDIN_CONFIG["error_rate"]:
+        return None
+    status = STANDIN_CONFIG["error_status"]
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": "Injected stand-in failure", "type": "server_error", "code": str(status)}},
+        headers={"Retry-After": "1"} if status == 429 else None
+    )
+
+
+def _input_tokens(body: Dict[str, Any]) -> int:
+    return max(len(json.dumps(body.get("input", ""))) // 4, 1)
+
+
+def _usage(body: Dict[str, Any]) -> Dict[str, Any]:
+    input_tokens = _input_tokens(body)
+    reasoning_tokens = STANDIN_CONFIG["reasoning_tokens"] if body.get("reasoning") else 0
+    output_tokens = STANDIN_CONFIG["output_tokens"] + reasoning_tokens
+    return {
+        "input_tokens": input_tokens,
+        "input_tokens_details": {"cached_tokens": int(input_tokens * STANDIN_CONFIG["cached_ratio"])},
+        "output_tokens": output_tokens,
+        "output_tokens_details": {"reasoning_tokens": reasoning_tokens},
+        "total_tokens": input_tokens + output_tokens
+    }
+
+
+def _output_words() -> List[str]:
+    return [f"word{n} " for n in range(STANDIN_CONFIG["output_tokens"])]
+
+
+def _response_object(body: Dict[str, Any], response_id: str, status: str, text: str, summary: str) -> Dict[str, Any]:
+    output = []
+    if body.get("reasoning"):
+        output.append({
+            "type": "reasoning",
+            "id": f"rs_{response_id}",
+            "summary": [{"type": "summary_text", "text": summary}] if summary else []
+        })
+    if status == "completed":
+        output.append({
+            "type": "message",
+            "id": f"msg_{response_id}",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}]
+        })
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model"),
+        "status": status,
+        "output": output,
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "reasoning": body.get("reasoning"),
+        "usage": _usage(body) if status == "completed" else None
+    }
+
+
+@app.post("/v1/responses")
+async def create_response(request: Request):
+    _count("responses")
+    body = await request.json()
+    error = _injected_error()
+    if error is not None:
+        await asyncio.sleep(_delay(STANDIN_CONFIG["latency_ms"]))
+        return error
+
+    response_id = f"resp_{uuid.uuid4().hex}"
+    words = _output_words()
+    summary = "Stand-in reasoning summary." if (body.get("reasoning") or {}).get("summary") else ""
+
+    if not body.get("stream"):
+        await asyncio.sleep(_delay(STANDIN_CONFIG["latency_ms"] + STANDIN_CONFIG["token_ms"] * len(words)))
+        return _response_object(body, response_id, "completed", "".join(words), summary)
+
+    async def events():
+        sequence = 0
+
+        def event(data: Dict[str, Any]) -> str:
+            nonlocal sequence
+            sequence += 1
+            return f"event: {data['type']}\ndata: {json.dumps({**data, 'sequence_number': sequence})}\n\n"
+
+        yield event({"type": "response.created", "response": _response_object(body, response_id, "in_progress", "", "")})
+        await asyncio.sleep(_delay(STANDIN_CONFIG["latency_ms"]))
+        if summary:
+            yield event({
+                "type": "response.reasoning_summary_text.delta",
+                "item_id": f"rs_{response_id}", "output_index": 0, "summary_index": 0, "delta": summary
+            })
+        for word in words:
+            yield event({
+                "type": "response.output_text.delta",
+                "item_id": f"msg_{response_id}", "output_index": 1, "content_index": 0, "delta": word
+            })
+            await asyncio.sleep(_delay(STANDIN_CONFIG["token_ms"]))
+        yield event({"type": "response.completed", "response": _response_object(body, response_id, "completed", "".join(words), summary)})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/moderations")
+async def create_moderation(request: Request):
+    _count("moderations")
+    body = await request.json()
+    error = _injected_error()
+    await asyncio.sleep(_delay(STANDIN_CONFIG["moderation_latency_ms"]))
+    if error is not None:
+        return error
+
+    inputs = body.get("input", "")
+    results = []
+    for _ in (inputs if isinstance(inputs, list) else [inputs]):
+        flagged = random.random() < STANDIN_CONFIG["flag_rate"]
+        flagged_category = random.choice(MODERATION_CATEGORIES) if flagged else None
+        results.append({
+            "flagged": flagged,
+            "categories": {category: category == flagged_category for category in MODERATION_CATEGORIES},
+            "category_scores": {
+                category: (random.uniform(0.6, 0.99) if category == flagged_category else random.uniform(0, 0.05))
+                for category in MODERATION_CATEGORIES
+            }
+        })
+    return {"id": f"modr-{uuid.uuid4().hex}", "model": body.get("model", "omni-moderation-latest"), "results": results}
+
+
+@app.post("/v1/files")
+async def upload_file(request: Request):
+    _count("files")
+    form = await request.form()
+    upload = form.get("file")
+    size = len(await upload.read()) if upload is not None else 0
+    await asyncio.sleep(_delay(STANDIN_CONFIG["stripe_latency_ms"]))
+    return {
+        "id": f"file-{uuid.uuid4().hex[:24]}",
+        "object": "file",
+        "bytes": size,
+        "created_at": int(time.time()),
+        "filename": getattr(upload, "filename", "upload"),
+        "purpose": form.get("purpose", "vision"),
+        "status": "processed"
+    }
+
+
+@app.get("/v1/models")
+async def list_models():
+    _count("models")
+    return {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "standin"} for model in ("gpt-5", "gpt-4.1")]}
+
+
+@app.get("/v1/account")
+async def stripe_account():
+    _count("stripe")
+    await asyncio.sleep(_delay(STANDIN_CONFIG["stripe_latency_ms"]))
+    return {"id": "acct_standin", "object": "account"}
+
+
+@app.post("/v1/{resource:path}")
+async def stripe_create(resource: str, request: Request):
+    """Stripe create/update calls (form encoded). Echoes the fields back on a new object."""
+    _count("stripe")
+    form = dict(await request.form())
+    await asyncio.sleep(_delay(STANDIN_CONFIG["stripe_latency_ms"]))
+
+    kind = STRIPE_OBJECTS.get(resource)
+    object_id = None
+    if kind is None and "/" in resource:
+        base, object_id = resource.rsplit("/", 1)  # e.g. subscriptions/sub_123
+        kind = STRIPE_OBJECTS.get(base)
+    if kind is None:
+        return JSONResponse(status_code=404, content={"error": {"message": f"Unknown stand-in resource: {resource}"}})
+
+    object_type, prefix = kind
+    result = {**form, "id": object_id or f"{prefix}_{uuid.uuid4().hex[:14]}", "object": object_type, "created": int(time.time())}
+    if object_type.endswith("session"):
+        result["url"] = f"http://localhost:{STANDIN_CONFIG['port']}/stand-in/{result['id']}"
+    return result
+
+
+@app.post("/emails")
+async def send_email(request: Request):
+    """Resend send-email endpoint"""
+    _count("emails")
+    await request.json()
+    await asyncio.sleep(_delay(STANDIN_CONFIG["email_latency_ms"]))
+    return {"id": str(uuid.uuid4())}
+
+
+@app.get("/stand-in/stats")
+async def get_stats():
+    """Calls received per upstream API since start"""
+    return {"calls": stats, "config": STANDIN_CONFIG}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=STANDIN_CONFIG["port"], log_level="warning")
@@ -8,6 +8,7 @@ from pathlib import Path
 
 # Configure Resend
 resend.api_key = os.getenv("RESEND_API_KEY")
+resend.api_url = os.getenv("RESEND_API_URL", "https://api.resend.com")
 
 # Setup Jinja2 for email templates
 template_dir = Path(__file__).parent / "email_templates"
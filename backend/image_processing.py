@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import openai
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+from admission import admission_controller
+from ai_client import ai_client
+from resilience import resilient_caller
+from single_flight import single_flight
+from monitoring import logger
+
+# Image preprocessing configuration
+IMAGE_CONFIG = {
+    # The model tiles images to fit 2048x2048 with the short side at 768px; anything larger is discarded upstream
+    "max_long_side": int(os.getenv("IMAGE_MAX_LONG_SIDE", "2048")),
+    "max_short_side": int(os.getenv("IMAGE_MAX_SHORT_SIDE", "768")),
+    "format": os.getenv("IMAGE_FORMAT", "JPEG"),  # JPEG or WEBP
+    "quality": int(os.getenv("IMAGE_QUALITY", "85")),
+    "max_pixels": 80_000_000,  # Refuse decompression bombs before decoding
+    "upload_files": os.getenv("IMAGE_UPLOAD_FILES", "true").lower() == "true",  # Reuse uploads via the Files API
+    "ttl": int(os.getenv("IMAGE_CACHE_TTL", "604800")),  # 7 days; uploaded files are deleted after this
+    "cleanup_interval": int(os.getenv("IMAGE_CLEANUP_INTERVAL", "3600")),  # Seconds between expired-upload sweeps, 0 disables
+    "cleanup_grace": 3600,  # Seconds a file outlives its references, for requests already holding one
+    "cleanup_batch": 100,
+    "local_max_entries": 500,
+    "key_prefix": "image_ref"
+}
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+FILES_API = "files"  # Admission budget and breaker for Files API calls
+
+# Process-wide decompression-bomb limit for Pillow
+Image.MAX_IMAGE_PIXELS = IMAGE_CONFIG["max_pixels"]
+
+
+def decode_image_data(image_data: str) -> bytes:
+    """Decode base64 image data, with or without a data: URL prefix"""
+    if image_data.startswith("data:"):
+        image_data = image_data.split(",", 1)[-1]
+    try:
+        return base64.b64decode(image_data, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="image_data must be base64 encoded")
+
+
+def target_scale(width: int, height: int) -> float:
+    """Factor that brings an image within the model's useful resolution (1.0 if it already is)"""
+    return min(
+        1.0,
+        IMAGE_CONFIG["max_long_side"] / max(width, height),
+        IMAGE_CONFIG["max_short_side"] / min(width, height)
+    )
+
+
+def preprocess_image(raw: bytes) -> Dict[str, Any]:
+    """Decode, downscale to the model's useful resolution and re-encode compactly.
+
+    The hash is taken over the normalized pixels, so the same picture sent as PNG,
+    JPEG or at a different size still maps to one entry.
+    """
+    try:
+        image = Image.open(io.BytesIO(raw))
+        # Let the JPEG decoder scale down by up to 8x while decoding, so a large photo is never
+        # decoded at full size; draft only goes as small as the target, the resize below does the rest
+        scale = target_scale(*image.size)
+        if scale < 1.0:
+            image.draft("RGB", (math.ceil(image.size[0] * scale), math.ceil(image.size[1] * scale)))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Unsupported or corrupt image: {str(e)}")
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # Flatten transparency onto white rather than letting it turn black
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    width, height = image.size
+    scale = target_scale(width, height)
+    if scale < 1.0:
+        image = image.resize((max(int(width * scale), 1), max(int(height * scale), 1)), Image.LANCZOS)
+
+    pixel_hash = hashlib.sha256(f"{image.size}".encode() + image.tobytes()).hexdigest()
+
+    encoded = io.BytesIO()
+    image.save(encoded, format=IMAGE_CONFIG["format"], quality=IMAGE_CONFIG["quality"], optimize=True)
+
+    return {
+        "pixel_hash": pixel_hash,
+        "data": encoded.getvalue(),
+        "mime_type": MIME_TYPES.get(IMAGE_CONFIG["format"].upper(), "image/jpeg"),
+        "width": image.size[0],
+        "height": image.size[1],
+        "original_bytes": len(raw)
+    }
+
+
+class ImageStore:
+    """Map image digests to the input_image reference sent upstream (an uploaded file id,
+    or a compact data URL). Redis-backed with an in-process fallback.
+
+    Uploaded files are tracked with the time their references expire, and a periodic sweep
+    deletes them from the Files API once that has passed.
+    """
+
+    def __init__(self, config: Dict[str, Any] = IMAGE_CONFIG):
+        self.config = config
+        self.redis = None
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._local_uploads: Dict[str, float] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.files_deleted = 0
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection (None keeps references in process)"""
+        self.redis = redis_client
+
+    def _key(self, kind: str, digest: str) -> str:
+        return f"{self.config['key_prefix']}:{kind}:{digest}"
+
+    async def get(self, kind: str, digest: str) -> Optional[Dict[str, Any]]:
+        key = self._key(kind, digest)
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"Image reference lookup failed, using local store: {str(e)}")
+        entry = self._local.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        self._local.move_to_end(key)
+        return entry[1]
+
+    async def set(self, kind: str, digest: str, reference: Dict[str, Any]):
+        key = self._key(kind, digest)
+        # A reference to an uploaded file never outlives the file
+        ttl = max(int(reference.get("expires_at", time.time() + self.config["ttl"]) - time.time()), 1)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, json.dumps(reference), ex=ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Image reference save failed, using local store: {str(e)}")
+        self._local[key] = (time.time() + ttl, reference)
+        self._local.move_to_end(key)
+        while len(self._local) > self.config["local_max_entries"]:
+            self._local.popitem(last=False)
+
+    async def track_upload(self, file_id: str, expires_at: float):
+        """Remember an uploaded file so the sweep deletes it once its references have expired"""
+        if self.redis is not None:
+            try:
+                await self.redis.zadd(self._key("uploads", "expiry"), {file_id: expires_at})
+                return
+            except Exception as e:
+                logger.warning(f"Image upload tracking failed, tracking in process: {str(e)}")
+        self._local_uploads[file_id] = expires_at
+
+    async def _claim_expired(self, cutoff: float) -> List[str]:
+        """Expired uploads this worker gets to delete; ZREM hands each one to a single worker"""
+        claimed = [file_id for file_id, expires_at in self._local_uploads.items() if expires_at <= cutoff]
+        for file_id in claimed:
+            del self._local_uploads[file_id]
+        if self.redis is not None:
+            key = self._key("uploads", "expiry")
+            try:
+                expired = await self.redis.zrangebyscore(key, "-inf", cutoff, start=0, num=self.config["cleanup_batch"])
+                claimed += [file_id for file_id in expired if await self.redis.zrem(key, file_id)]
+            except Exception as e:
+                logger.warning(f"Expired image upload lookup failed: {str(e)}")
+        return claimed
+
+    async def delete_expired_uploads(self) -> int:
+        """Delete uploaded files whose references expired more than cleanup_grace seconds ago"""
+        deleted = 0
+        for file_id in await self._claim_expired(time.time() - self.config["cleanup_grace"]):
+            try:
+                await resilient_caller.call(FILES_API, lambda: ai_client.client.files.delete(file_id))
+            except openai.NotFoundError:
+                pass  # Already gone
+            except Exception as e:
+                logger.warning(f"Deleting image upload {file_id} failed, retrying next sweep: {str(e)}")
+                await self.track_upload(file_id, time.time() - self.config["cleanup_grace"])
+                continue
+            deleted += 1
+        self.files_deleted += deleted
+        return deleted
+
+    async def start(self):
+        """Start the periodic sweep of expired uploads"""
+        if self.config["upload_files"] and self.config["cleanup_interval"] > 0:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.config["cleanup_interval"])
+            try:
+                deleted = await self.delete_expired_uploads()
+                if deleted:
+                    logger.info(f"Deleted {deleted} expired image uploads")
+            except Exception as e:
+                logger.error(f"Image upload sweep failed: {str(e)}")
+
+
+# Global instance
+image_store = ImageStore()
+
+
+async def _upload(prepared: Dict[str, Any], plan: str = "free") -> Dict[str, Any]:
+    """Upload a prepared image once per pixel hash and return its input_image reference"""
+    existing = await image_store.get("pixels", prepared["pixel_hash"])
+    if existing is not None:
+        return existing
+
+    reference = {
+        "pixel_hash": prepared["pixel_hash"],
+        "width": prepared["width"],
+        "height": prepared["height"],
+        "encoded_bytes": len(prepared["data"])
+    }
+    if IMAGE_CONFIG["upload_files"]:
+        extension = "webp" if prepared["mime_type"] == "image/webp" else "jpg"
+        reservation = await admission_controller.acquire(FILES_API, 0, plan)
+        try:
+            uploaded = await resilient_caller.call(FILES_API, lambda: ai_client.client.files.create(
+                file=(f"{prepared['pixel_hash'][:16]}.{extension}", prepared["data"], prepared["mime_type"]),
+                purpose="vision"
+            ))
+        finally:
+            admission_controller.settle(reservation, 0)
+        reference["part"] = {"type": "input_image", "file_id": uploaded.id}
+        reference["expires_at"] = time.time() + IMAGE_CONFIG["ttl"]
+        await image_store.track_upload(uploaded.id, reference["expires_at"])
+    else:
+        encoded = base64.b64encode(prepared["data"]).decode("ascii")
+        reference["part"] = {"type": "input_image", "image_url": f"data:{prepared['mime_type']};base64,{encoded}"}
+
+    await image_store.set("pixels", prepared["pixel_hash"], reference)
+    return reference
+
+
+async def prepare_image_input(image_data: str, plan: str = "free") -> Dict[str, Any]:
+    """Turn client base64 image data into a reusable input_image reference.
+
+    Byte-identical images skip decoding entirely; pixel-identical ones reuse the upload.
+    plan sets the upload's admission priority.
+    """
+    raw = decode_image_data(image_data)
+    raw_digest = hashlib.sha256(raw).hexdigest()
+
+    reference = await image_store.get("raw", raw_digest)
+    if reference is not None:
+        return {**reference, "original_bytes": len(raw)}
+
+    prepared = await asyncio.to_thread(preprocess_image, raw)
+    reference, _ = await single_flight.do(
+        f"image:{prepared['pixel_hash']}",
+        lambda: _upload(prepared, plan),
+        lookup=lambda: image_store.get("pixels", prepared["pixel_hash"])
+    )
+    await image_store.set("raw", raw_digest, reference)
+    return {**reference, "original_bytes": len(raw)}
@@ -1,12 +1,11 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, Depends, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import openai
-from openai import OpenAI
 import stripe
 
 from vercel_blob import put, delete, list_blobs
@@ -15,22 +14,26 @@ import asyncio
 import json
 import os
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timezone
 import httpx
 from pathlib import Path
 import base64
 import re
+import time
+from contextlib import aclosing
 
-from database import get_db, create_tables, User, Project, RenderJob, ProjectAnalytics, AISession
+from database import get_db, get_async_db, AsyncSessionLocal, async_engine, create_tables, check_indexes, User, Project, RenderJob, ProjectAnalytics, AISession
+from database import SupportTicket, ContentReport, ModerationAction, ContentFlag
 from database import (
-    get_user_by_email, get_user_by_username, create_user, get_user_projects, 
+    get_user_by_email, get_user_by_username, create_user, get_user_by_id_async, get_user_projects_async,
+    get_user_stats_async, get_user_stats_map,
     create_project, update_project, create_render_job, update_render_job, log_ai_session,
-    create_support_ticket, get_support_tickets, get_user_tickets, update_ticket_status,
-    assign_ticket, add_ticket_response, get_ticket_responses, get_ticket_stats,
+    create_support_ticket_async, get_support_tickets_async, get_user_tickets_async, update_ticket_status_async,
+    get_ticket_async, assign_ticket_async, add_ticket_response_async, get_ticket_responses_async, get_ticket_stats_async,
     create_content_report, get_content_reports, update_report_status, create_moderation_action,
-    get_moderation_actions, create_content_flag, get_content_flags, get_moderation_stats,
-    moderate_content_with_ai, auto_moderate_project
+    get_moderation_actions, create_content_flag, get_content_flags, get_moderation_stats, stats_cache,
+    load_moderated_content
 )
 from auth import verify_password, get_password_hash, create_access_token, verify_token
 
@@ -41,7 +44,7 @@ from stripe_integration import (
 )
 from database import (
     get_user_by_stripe_customer_id, update_user_subscription, create_payment_record,
-    update_user_usage, reset_monthly_usage, get_project
+    update_user_usage, reset_monthly_usage
 )
 
 from security import (
@@ -57,21 +60,37 @@ from monitoring import (
 
 from email_service import email_service
 
+from ai_client import ai_client, ai_call, ai_stream
+from admission import admission_controller
+from resilience import resilient_caller
+from ai_cache import response_cache
+from single_flight import single_flight
+from reasoning_jobs import reasoning_jobs, TERMINAL_STATUSES
+from usage_ledger import usage_ledger
+from agent_graph import AGENT_DEFINITIONS, AGENT_GRAPH_CONFIG, parse_agent_graph, execute_agent_graph, summarize_agent_graph
+from prompt_templates import prompt_registry
+from image_processing import image_store, prepare_image_input
+from moderation_engine import moderation_engine
+from user_stats import user_stats_reconciler
+from admin_stats import admin_stats
+from pagination import Keyset
+from moderation_prefilter import moderation_prefilter
+
 import redis
+import redis.asyncio
 import os
 from pathlib import Path
 from sqlalchemy import func
 
 app = FastAPI(title="FilmFusion Backend API", version="1.0.0")
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
 # Security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 app.add_middleware(
     TrustedHostMiddleware, 
@@ -111,11 +130,31 @@ async def monitoring_middleware_wrapper(request: Request, call_next):
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    try:
+        check_indexes()
+    except Exception as e:
+        logger.warning(f"Index check failed: {str(e)}")
     setup_monitoring()
+    await reasoning_jobs.start()
+    await usage_ledger.start()
+    await moderation_engine.start()
+    await user_stats_reconciler.start()
+    await admin_stats.start()
+    await image_store.start()
     logger.info("FilmFusion Backend API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await reasoning_jobs.stop()
+    await moderation_engine.stop()
+    await user_stats_reconciler.stop()
+    await admin_stats.stop()
+    await image_store.stop()
+    await usage_ledger.stop()
+    await ai_client.close()
+    await async_engine.dispose()
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
     logger.info("FilmFusion Backend API shutting down")
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -131,6 +170,17 @@ except Exception as e:
     print(f"❌ Redis connection failed: {e}")
     redis_client = None
 
+# Connection for the request path; blocking calls there would stall the event loop
+async_redis_client = redis.asyncio.from_url(REDIS_URL, decode_responses=True) if redis_client else None
+
+response_cache.bind_redis(async_redis_client)
+single_flight.bind_redis(async_redis_client)
+reasoning_jobs.bind_redis(async_redis_client)
+image_store.bind_redis(async_redis_client)
+moderation_engine.bind_redis(async_redis_client)
+user_stats_reconciler.bind_redis(async_redis_client)
+admin_stats.bind_redis(async_redis_client)
+
 @app.get("/health")
 async def health_check():
     """Enhanced health check with Redis and volume status"""
@@ -178,6 +228,7 @@ async def detailed_health_check(db: Session = Depends(get_db)):
             "database": await health_checker.check_database(db),
             "openai_api": await health_checker.check_openai_api(),
             "stripe_api": await health_checker.check_stripe_api(),
+            "ai_circuit_breakers": resilient_caller.health_check(),
             "system_resources": health_checker.check_system_resources()
         }
         
@@ -210,13 +261,20 @@ async def get_metrics():
         metrics = performance_monitor.get_metrics()
         return {
             "timestamp": datetime.utcnow().isoformat(),
-            "metrics": metrics
+            "metrics": metrics,
+            "ai_client": ai_client.get_stats(),
+            "ai_admission": admission_controller.get_stats(),
+            "ai_usage_ledger": usage_ledger.get_stats(),
+            "moderation_prefilter": moderation_prefilter.get_stats(),
+            "user_stats": user_stats_reconciler.get_stats(),
+            "admin_stats": admin_stats.get_stats(),
+            "admin_queue_stats": stats_cache.get_stats()
         }
     except Exception as e:
         error_handler.log_error(e, {"endpoint": "/metrics"})
         raise HTTPException(status_code=500, detail="Failed to retrieve metrics")
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> User:
     """Get current authenticated user"""
     token = credentials.credentials
     payload = verify_token(token)
@@ -232,12 +290,62 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await get_user_by_id_async(db, int(user_id))
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
     return user
 
+async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[User]:
+    """Get the authenticated user if a valid token was sent, otherwise None.
+
+    The token is checked first, so anonymous calls never open a database session.
+    """
+    user_id = token_user_id(credentials.credentials if credentials else None)
+    if user_id is None:
+        return None
+    async with AsyncSessionLocal() as db:
+        return await get_user_by_id_async(db, user_id)
+
+def token_user_id(token: Optional[str]) -> Optional[int]:
+    """User id a bearer token was issued for, or None if it is missing, invalid or malformed"""
+    payload = verify_token(token) if token else None
+    try:
+        return int(payload["sub"]) if payload else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+async def get_websocket_user(websocket: WebSocket) -> Optional[User]:
+    """The user a WebSocket authenticates as, from a ?token= query param or an Authorization: Bearer header"""
+    token = websocket.query_params.get("token")
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    
+    user_id = token_user_id(token)
+    if user_id is None:
+        return None
+    async with AsyncSessionLocal() as db:
+        return await get_user_by_id_async(db, user_id)
+
+def owns_job(job: Dict[str, Any], user: Optional[User]) -> bool:
+    """A reasoning job is visible only to the user who submitted it; anonymous jobs only to anonymous callers"""
+    return job.get("user_id") == (user.id if user else None)
+
+def caller_plan(user: Optional[User]) -> str:
+    """Plan used to prioritise a caller's AI calls; anonymous and lapsed accounts count as free"""
+    if user is None or user.subscription_status not in ("active", "trialing"):
+        return "free"
+    return user.subscription_plan or "free"
+
+def ai_caller(user: Optional[User]) -> Dict[str, Any]:
+    """Who an AI call is made for: the plan sets its priority, the user id is charged its usage"""
+    return {"plan": caller_plan(user), "user_id": user.id if user else None}
+
+async def get_ai_caller(current_user: Optional[User] = Depends(get_optional_user)) -> Dict[str, Any]:
+    """Dependency form of ai_caller()"""
+    return ai_caller(current_user)
+
 async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """Verify user has admin privileges"""
     if not current_user.is_admin:
@@ -394,9 +502,9 @@ async def login(request: Request, data: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/projects")
-async def get_projects(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_projects(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get user's projects"""
-    projects = get_user_projects(db, current_user.id)
+    projects = await get_user_projects_async(db, current_user.id)
     
     return {
         "success": True,
@@ -443,365 +551,477 @@ async def create_new_project(request: dict, current_user: User = Depends(get_cur
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/dashboard/analytics")
-async def get_dashboard_analytics(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_dashboard_analytics(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get dashboard analytics for user"""
     try:
-        # Get user's projects and analytics
-        projects = get_user_projects(db, current_user.id)
-        total_projects = len(projects)
-        
-        # Calculate analytics
-        completed_projects = len([p for p in projects if p.status == "completed"])
-        in_progress_projects = len([p for p in projects if p.status == "in_progress"])
-        
-        # Get render jobs
-        render_jobs = db.query(RenderJob).filter(RenderJob.user_id == current_user.id).all()
-        total_renders = len(render_jobs)
-        successful_renders = len([r for r in render_jobs if r.status == "completed"])
-        
-        # Get AI usage
-        ai_sessions = db.query(AISession).filter(AISession.user_id == current_user.id).all()
-        total_ai_calls = len(ai_sessions)
-        total_tokens = sum(s.tokens_used for s in ai_sessions)
+        # One primary-key lookup on the user_stats rollup
+        stats = await get_user_stats_async(db, current_user.id)
+        total_renders = stats["renders_total"]
         
         return {
             "success": True,
             "analytics": {
-                "total_projects": total_projects,
-                "completed_projects": completed_projects,
-                "in_progress_projects": in_progress_projects,
+                "total_projects": stats["projects_total"],
+                "completed_projects": stats["projects_completed"],
+                "in_progress_projects": stats["projects_in_progress"],
                 "total_renders": total_renders,
-                "successful_renders": successful_renders,
-                "render_success_rate": (successful_renders / total_renders * 100) if total_renders > 0 else 0,
-                "total_ai_calls": total_ai_calls,
-                "total_tokens_used": total_tokens,
+                "successful_renders": stats["renders_completed"],
+                "render_success_rate": (stats["renders_completed"] / total_renders * 100) if total_renders > 0 else 0,
+                "total_ai_calls": stats["ai_calls"],
+                "total_tokens_used": stats["tokens_used"],
+                "render_minutes": round(stats["render_minutes"], 2),
                 "account_type": "Premium" if current_user.is_premium else "Free"
             }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def sse_response(events) -> StreamingResponse:
+    """Relay (event, data) pairs to the client as Server-Sent Events as they are produced.
+    
+    The first event is awaited before responding, so admission rejections reach the
+    client as a plain 429 instead of an error inside the stream.
+    """
+    first = await events.__anext__()
+    
+    async def event_stream():
+        try:
+            yield format_sse(*first)
+            async for event, data in events:
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse("error", {"message": str(e)})
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/reasoning/plan-video")
-async def plan_video_with_reasoning(request: dict):
+async def plan_video_with_reasoning(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
     """Use reasoning models for complex video planning and strategy"""
     try:
-        response = await openai_client.responses.create(
+        params = dict(
             model="gpt-5",  # Use reasoning model
             reasoning={
                 "effort": request.get('reasoning_effort', 'medium'),  # low, medium, high
                 "summary": "auto"  # Get reasoning summary
             },
-            input=[{
-                "role": "developer",
-                "content": f"""
-                Formatting re-enabled
-                
-                Plan a comprehensive video creation strategy for: {request.get('topic', 'product demo')}
-                
-                Requirements:
-                - Target audience: {request.get('audience', 'general')}
-                - Platform: {request.get('platform', 'YouTube')}
-                - Duration: {request.get('duration', '5 minutes')}
-                - Budget: {request.get('budget', 'moderate')}
-                - Goals: {', '.join(request.get('goals', ['engagement', 'conversion']))}
-                
-                Create a detailed multi-step plan including:
-                1. Content strategy and messaging
-                2. Visual style and aesthetic direction
-                3. Script structure and key talking points
-                4. Production timeline and milestones
-                5. Distribution and promotion strategy
-                6. Success metrics and KPIs
-                
-                Consider current trends, platform best practices, and audience psychology.
-                """
-            }],
+            input=prompt_registry.render("plan-video", {
+                "topic": request.get('topic', 'product demo'),
+                "audience": request.get('audience', 'general'),
+                "platform": request.get('platform', 'YouTube'),
+                "duration": request.get('duration', '5 minutes'),
+                "budget": request.get('budget', 'moderate'),
+                "goals": ', '.join(request.get('goals', ['engagement', 'conversion']))
+            }),
             max_output_tokens=25000  # Reserve space for reasoning
         )
         
-        # Extract reasoning summary and plan
-        reasoning_summary = ""
-        plan_content = response.output_text or "Planning failed"
+        if request.get('stream'):
+            return await sse_response(ai_stream(**params, **caller))
         
-        for output in response.output:
-            if output.type == "reasoning" and hasattr(output, 'summary'):
-                reasoning_summary = output.summary[0].text if output.summary else ""
+        # Repeats of the same brief are common and the prompt is fully determined by it
+        result = await ai_call(**params, **caller, cache=True)
         
         return {
             "success": True,
-            "plan": plan_content,
-            "reasoning_summary": reasoning_summary,
-            "reasoning_tokens": response.usage.output_tokens_details.reasoning_tokens if hasattr(response.usage, 'output_tokens_details') else 0,
-            "total_tokens": response.usage.total_tokens,
-            "response_id": response.id,
+            "plan": result["output_text"] or "Planning failed",
+            "reasoning_summary": result["reasoning_summary"],
+            "reasoning_tokens": result["reasoning_tokens"],
+            "total_tokens": result["total_tokens"],
+            "response_id": result["response_id"],
+            "cached": result["cached"],
             "effort_level": request.get('reasoning_effort', 'medium')
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Video planning failed: {str(e)}")
 
 @app.post("/api/reasoning/analyze-content")
-async def analyze_content_with_reasoning(request: dict):
+async def analyze_content_with_reasoning(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
     """Use reasoning models for deep content analysis and optimization"""
     try:
-        response = await openai_client.responses.create(
+        params = dict(
             model="gpt-5",
             reasoning={
                 "effort": "high",  # Use high effort for detailed analysis
                 "summary": "detailed"
             },
-            input=[{
-                "role": "developer", 
-                "content": f"""
-                Formatting re-enabled
-                
-                Analyze this video content for optimization opportunities:
-                
-                **Script:** {request.get('script', '')}
-                **Target Platform:** {request.get('platform', 'YouTube')}
-                **Current Performance:** {request.get('performance_data', 'No data available')}
-                **Competitor Analysis:** {request.get('competitor_data', 'Not provided')}
-                
-                Provide detailed analysis including:
-                1. Content strengths and weaknesses
-                2. Audience engagement predictions
-                3. Platform-specific optimization recommendations
-                4. A/B testing suggestions
-                5. Viral potential assessment
-                6. Conversion optimization strategies
-                
-                Use data-driven insights and psychological principles to support recommendations.
-                """
-            }]
+            input=prompt_registry.render("analyze-content", {
+                "script": request.get('script', ''),
+                "platform": request.get('platform', 'YouTube'),
+                "performance_data": request.get('performance_data', 'No data available'),
+                "competitor_data": request.get('competitor_data', 'Not provided')
+            })
         )
         
+        if request.get('stream'):
+            return await sse_response(ai_stream(**params, **caller))
+        
+        result = await ai_call(**params, **caller)
+        
         return {
             "success": True,
-            "analysis": response.output_text,
-            "reasoning_tokens": response.usage.output_tokens_details.reasoning_tokens if hasattr(response.usage, 'output_tokens_details') else 0,
-            "response_id": response.id
+            "analysis": result["output_text"],
+            "reasoning_tokens": result["reasoning_tokens"],
+            "response_id": result["response_id"],
+            "cached": result["cached"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Content analysis failed: {str(e)}")
 
 @app.post("/api/reasoning/visual-analysis")
-async def visual_analysis_with_reasoning(request: dict):
+async def visual_analysis_with_reasoning(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
     """Use reasoning models for visual content analysis and recommendations"""
     try:
         # Handle image upload or URL
         image_data = request.get('image_data')  # Base64 encoded image
         image_url = request.get('image_url')
         
-        content_parts = [{
-            "type": "text",
-            "text": f"""
-            Formatting re-enabled
-            
-            Analyze this visual content for video production:
-            
-            **Context:** {request.get('context', 'Video thumbnail/visual asset')}
-            **Platform:** {request.get('platform', 'YouTube')}
-            **Target Audience:** {request.get('audience', 'general')}
-            
-            Provide detailed visual analysis including:
-            1. Composition and design principles assessment
-            2. Color psychology and brand alignment
-            3. Accessibility and readability evaluation
-            4. Platform-specific optimization suggestions
-            5. A/B testing variations recommendations
-            6. Emotional impact and engagement predictions
-            
-            Consider current design trends and platform best practices.
-            """
-        }]
-        
+        images = []
+        image = None
         if image_data:
-            content_parts.append({
-                "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}
-            })
+            # Downscaled, re-encoded and uploaded once per image, so repeats reuse the same reference
+            image = await prepare_image_input(image_data, caller["plan"])
+            images.append(image["part"])
         elif image_url:
-            content_parts.append({
-                "type": "image_url", 
-                "image_url": {"url": image_url}
-            })
+            images.append({"type": "input_image", "image_url": image_url})
         
-        response = await openai_client.responses.create(
+        params = dict(
             model="gpt-5",  # o1 supports vision
             reasoning={"effort": "medium", "summary": "auto"},
-            input=[{
-                "role": "developer",
-                "content": content_parts
-            }]
+            input=prompt_registry.render("visual-analysis", {
+                "context": request.get('context', 'Video thumbnail/visual asset'),
+                "platform": request.get('platform', 'YouTube'),
+                "audience": request.get('audience', 'general')
+            }, attachments=images)
         )
         
+        if request.get('stream'):
+            return await sse_response(ai_stream(**params, **caller))
+        
+        result = await ai_call(**params, **caller)
+        
         return {
             "success": True,
-            "visual_analysis": response.output_text,
-            "reasoning_tokens": response.usage.output_tokens_details.reasoning_tokens if hasattr(response.usage, 'output_tokens_details') else 0,
-            "response_id": response.id
+            "visual_analysis": result["output_text"],
+            "reasoning_tokens": result["reasoning_tokens"],
+            "response_id": result["response_id"],
+            "cached": result["cached"],
+            "image": {key: image[key] for key in ("pixel_hash", "width", "height", "original_bytes", "encoded_bytes")} if image else None
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Visual analysis failed: {str(e)}")
 
 @app.post("/api/reasoning/debug-workflow")
-async def debug_workflow_with_reasoning(request: dict):
+async def debug_workflow_with_reasoning(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
     """Use reasoning models to debug and optimize video creation workflows"""
     try:
-        response = await openai_client.responses.create(
+        params = dict(
             model="gpt-5",
             reasoning={"effort": "high", "summary": "detailed"},
-            input=[{
-                "role": "developer",
-                "content": f"""
-                Formatting re-enabled
-                
-                Debug and optimize this video creation workflow:
-                
-                **Current Workflow:** {request.get('workflow_steps', [])}
-                **Issues Encountered:** {request.get('issues', [])}
-                **Performance Metrics:** {request.get('metrics', {})}
-                **Resource Constraints:** {request.get('constraints', {})}
-                
-                Provide comprehensive workflow optimization including:
-                1. Root cause analysis of current issues
-                2. Step-by-step workflow improvements
-                3. Resource allocation optimization
-                4. Quality assurance checkpoints
-                5. Automation opportunities
-                6. Scalability recommendations
-                
-                Focus on efficiency, quality, and maintainability.
-                """
-            }]
+            input=prompt_registry.render("debug-workflow", {
+                "workflow_steps": request.get('workflow_steps', []),
+                "issues": request.get('issues', []),
+                "metrics": request.get('metrics', {}),
+                "constraints": request.get('constraints', {})
+            })
         )
         
+        if request.get('stream'):
+            return await sse_response(ai_stream(**params, **caller))
+        
+        result = await ai_call(**params, **caller)
+        
         return {
             "success": True,
-            "workflow_optimization": response.output_text,
-            "reasoning_tokens": response.usage.output_tokens_details.reasoning_tokens if hasattr(response.usage, 'output_tokens_details') else 0,
-            "response_id": response.id
+            "workflow_optimization": result["output_text"],
+            "reasoning_tokens": result["reasoning_tokens"],
+            "response_id": result["response_id"],
+            "cached": result["cached"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Workflow debugging failed: {str(e)}")
 
 @app.post("/api/reasoning/multi-agent-orchestration")
-async def multi_agent_orchestration(request: dict):
+async def multi_agent_orchestration(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
     """Use reasoning models to orchestrate multiple AI agents for complex video projects"""
+    try:
+        max_concurrency = int(request.get('max_concurrency', AGENT_GRAPH_CONFIG["default_concurrency"]))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Max concurrency must be an integer")
+    max_concurrency = max(1, min(max_concurrency, AGENT_GRAPH_CONFIG["max_concurrency"]))
+    
     try:
         # First, use reasoning model as the "planner"
-        planning_response = await openai_client.responses.create(
+        planning_params = dict(
             model="gpt-5",
             reasoning={"effort": "high", "summary": "auto"},
-            input=[{
-                "role": "developer",
-                "content": f"""
-                Formatting re-enabled
-                
-                Act as the master planner for this complex video project:
-                
-                **Project:** {request.get('project_description', '')}
-                **Requirements:** {request.get('requirements', {})}
-                **Available Resources:** {request.get('resources', {})}
-                **Timeline:** {request.get('timeline', 'flexible')}
-                
-                Create a detailed execution plan that assigns specific tasks to specialized AI agents:
-                1. Script Writer Agent - for content creation
-                2. Visual Designer Agent - for graphics and thumbnails  
-                3. Video Editor Agent - for timeline and effects
-                4. SEO Optimizer Agent - for discoverability
-                5. Quality Assurance Agent - for final review
-                
-                For each agent, specify:
-                - Exact tasks and deliverables
-                - Input requirements and dependencies
-                - Success criteria and quality metrics
-                - Handoff procedures between agents
-                
-                Optimize for efficiency and quality while managing dependencies.
-                """
-            }]
+            input=prompt_registry.render("multi-agent-planner", {
+                "project_description": request.get('project_description', ''),
+                "requirements": request.get('requirements', {}),
+                "resources": request.get('resources', {}),
+                "timeline": request.get('timeline', 'flexible')
+            })
         )
         
-        # Extract the plan and execute agent tasks
-        master_plan = planning_response.output_text
-        agent_results = {}
+        if request.get('stream'):
+            return await sse_response(orchestration_events(request, planning_params, max_concurrency, caller))
         
-        # Execute tasks with appropriate models based on the plan
-        if "script" in request.get('project_description', '').lower():
-            # Use GPT model for script execution (faster)
-            script_response = await openai_client.responses.create(
-                model="gpt-4.1",
-                input=f"Based on this plan: {master_plan}\n\nExecute the script writing task with these requirements: {request.get('requirements', {})}"
-            )
-            agent_results['script_agent'] = script_response.output_text
-        
-        if "visual" in request.get('project_description', '').lower():
-            # Use reasoning model for complex visual planning
-            visual_response = await openai_client.responses.create(
-                model="gpt-5",
-                reasoning={"effort": "medium"},
-                input=[{
-                    "role": "developer",
-                    "content": f"Based on this plan: {master_plan}\n\nExecute the visual design task with these requirements: {request.get('requirements', {})}"
-                }]
+        planning_result = await ai_call(**planning_params, **caller)
+        
+        # Extract the plan and run the agents it assigns, independent ones in parallel
+        master_plan = planning_result["output_text"]
+        graph = parse_agent_graph(master_plan)
+        
+        graph_start = time.time()
+        reports = [
+            report async for report in execute_agent_graph(
+                graph, master_plan, request.get('requirements', {}), max_concurrency, caller
             )
-            agent_results['visual_agent'] = visual_response.output_text
+        ]
+        agent_graph = summarize_agent_graph(reports, (time.time() - graph_start) * 1000)
+        
+        agent_results = {
+            AGENT_DEFINITIONS[report["agent"]]["result_key"]: report["output"]
+            for report in reports if report["status"] == "completed"
+        }
         
         return {
             "success": True,
             "master_plan": master_plan,
             "agent_results": agent_results,
+            "agent_graph": agent_graph,
             "orchestration_summary": "Multi-agent workflow executed successfully",
-            "total_reasoning_tokens": planning_response.usage.output_tokens_details.reasoning_tokens if hasattr(planning_response.usage, 'output_tokens_details') else 0,
-            "response_id": planning_response.id
+            "total_reasoning_tokens": planning_result["reasoning_tokens"],
+            "response_id": planning_result["response_id"],
+            "cached": planning_result["cached"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Multi-agent orchestration failed: {str(e)}")
 
+async def orchestration_events(request: dict, planning_params: Dict[str, Any], max_concurrency: int, caller: Dict[str, Any]):
+    """Stream the planner as it reasons, then each agent's result as soon as it is done"""
+    plan_parts = []
+    async with aclosing(ai_stream(**planning_params, **caller)) as planner:
+        async for event, data in planner:
+            if event == "output":
+                plan_parts.append(data["delta"])
+            if event == "usage":
+                data = {**data, "stage": "planner"}
+            yield event, data
+            if event == "error":
+                return
+    
+    graph = parse_agent_graph("".join(plan_parts))
+    graph_start = time.time()
+    reports = []
+    async for report in execute_agent_graph(graph, "".join(plan_parts), request.get('requirements', {}), max_concurrency, caller):
+        reports.append(report)
+        yield "agent", report
+    yield "done", summarize_agent_graph(reports, (time.time() - graph_start) * 1000)
+
+def evaluation_params(request: dict) -> Dict[str, Any]:
+    """Build the judge call for one piece of content"""
+    return dict(
+        model="gpt-5",
+        reasoning={"effort": "high", "summary": "detailed"},
+        input=prompt_registry.render("evaluate-content", {
+            "content": request.get('content', ''),
+            "content_type": request.get('content_type', 'script'),
+            "criteria": request.get('criteria', ['quality', 'engagement', 'clarity', 'effectiveness']),
+            "audience": request.get('audience', 'general'),
+            "platform": request.get('platform', 'YouTube')
+        })
+    )
+
 @app.post("/api/reasoning/evaluate-content")
-async def evaluate_content_with_reasoning(request: dict):
+async def evaluate_content_with_reasoning(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
     """Use reasoning models as judges to evaluate content quality"""
     try:
-        response = await openai_client.responses.create(
-            model="gpt-5",
-            reasoning={"effort": "high", "summary": "detailed"},
-            input=[{
-                "role": "developer",
-                "content": f"""
-                Formatting re-enabled
-                
-                Act as an expert content evaluator and judge this video content:
-                
-                **Content to Evaluate:** {request.get('content', '')}
-                **Content Type:** {request.get('content_type', 'script')}
-                **Evaluation Criteria:** {request.get('criteria', ['quality', 'engagement', 'clarity', 'effectiveness'])}
-                **Target Audience:** {request.get('audience', 'general')}
-                **Platform:** {request.get('platform', 'YouTube')}
-                
-                Provide comprehensive evaluation including:
-                1. Detailed scoring (1-10) for each criterion
-                2. Specific strengths and weaknesses
-                3. Improvement recommendations
-                4. Comparison to industry benchmarks
-                5. Predicted performance metrics
-                6. Risk assessment and mitigation strategies
-                
-                Use objective analysis and provide actionable feedback.
-                """
-            }]
-        )
+        params = evaluation_params(request)
+        
+        if request.get('stream'):
+            return await sse_response(ai_stream(**params, **caller))
+        
+        result = await ai_call(**params, **caller, cache=True)
         
         return {
             "success": True,
-            "evaluation": response.output_text,
-            "reasoning_summary": "",  # Extract from response if available
+            "evaluation": result["output_text"],
+            "reasoning_summary": result["reasoning_summary"],
             "confidence_score": 0.95,  # High confidence due to reasoning model
-            "reasoning_tokens": response.usage.output_tokens_details.reasoning_tokens if hasattr(response.usage, 'output_tokens_details') else 0,
-            "response_id": response.id
+            "reasoning_tokens": result["reasoning_tokens"],
+            "response_id": result["response_id"],
+            "cached": result["cached"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Content evaluation failed: {str(e)}")
 
+BATCH_EVALUATION_CONFIG = {
+    "max_items": int(os.getenv("BATCH_EVALUATION_MAX_ITEMS", "200")),
+    "default_concurrency": 8,
+    "max_concurrency": int(os.getenv("BATCH_EVALUATION_MAX_CONCURRENCY", "32"))
+}
+
+class BatchEvaluationItem(BaseModel):
+    """One batch entry; a bare string is shorthand for {"content": ...}"""
+    content: str = ''
+    id: Optional[Union[int, str]] = None
+
+@app.post("/api/reasoning/evaluate-content/batch")
+async def evaluate_content_batch(request: dict, caller: Dict[str, Any] = Depends(get_ai_caller)):
+    """Evaluate many contents against shared criteria, streaming NDJSON results as each finishes"""
+    contents = request.get('contents')
+    if not isinstance(contents, list) or not contents:
+        raise HTTPException(status_code=400, detail="Contents must be a non-empty list")
+    if len(contents) > BATCH_EVALUATION_CONFIG["max_items"]:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_EVALUATION_CONFIG['max_items']} contents per batch")
+    
+    try:
+        concurrency = int(request.get('concurrency', BATCH_EVALUATION_CONFIG["default_concurrency"]))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Concurrency must be an integer")
+    concurrency = max(1, min(concurrency, BATCH_EVALUATION_CONFIG["max_concurrency"]))
+    
+    shared = {key: request[key] for key in ('content_type', 'criteria', 'audience', 'platform') if key in request}
+    
+    items: List[BatchEvaluationItem] = []
+    for index, item in enumerate(contents):
+        try:
+            items.append(BatchEvaluationItem(content=item) if isinstance(item, str) else BatchEvaluationItem(**item))
+        except (TypeError, ValidationError):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Contents item {index} must be a string or an object with a string content and a string or integer id"
+            )
+    
+    # Identical contents are evaluated once and fanned back out to every index
+    unique_contents: Dict[str, List[int]] = {}
+    for index, item in enumerate(items):
+        unique_contents.setdefault(item.content, []).append(index)
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def evaluate(content: str, indices: List[int]):
+        async with semaphore:
+            try:
+                result = await ai_call(**evaluation_params({**shared, 'content': content}), **caller, cache=True)
+                return indices, {
+                    "success": True,
+                    "evaluation": result["output_text"],
+                    "reasoning_summary": result["reasoning_summary"],
+                    "reasoning_tokens": result["reasoning_tokens"],
+                    "response_id": result["response_id"],
+                    "cached": result["cached"]
+                }
+            except Exception as e:
+                return indices, {"success": False, "error": f"Content evaluation failed: {str(e)}"}
+    
+    async def results():
+        tasks = [asyncio.create_task(evaluate(content, indices)) for content, indices in unique_contents.items()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indices, item = await finished
+                for index in indices:
+                    yield json.dumps({"index": index, "id": items[index].id, **item}) + "\n"
+            yield json.dumps({"done": True, "total": len(contents), "unique": len(unique_contents)}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+reasoning_jobs.register("plan-video", plan_video_with_reasoning)
+reasoning_jobs.register("analyze-content", analyze_content_with_reasoning)
+reasoning_jobs.register("visual-analysis", visual_analysis_with_reasoning)
+reasoning_jobs.register("debug-workflow", debug_workflow_with_reasoning)
+reasoning_jobs.register("multi-agent-orchestration", multi_agent_orchestration)
+reasoning_jobs.register("evaluate-content", evaluate_content_with_reasoning)
+
+@app.post("/api/reasoning/jobs", status_code=202)
+async def submit_reasoning_job(request: dict, current_user: Optional[User] = Depends(get_optional_user)):
+    """Queue a reasoning task and return a job id to poll or subscribe to"""
+    task = request.get('task')
+    payload = request.get('payload') or {}
+    
+    if not task:
+        raise HTTPException(status_code=400, detail="Task is required")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Payload must be an object")
+    
+    job = await reasoning_jobs.submit(task, payload, caller=ai_caller(current_user))
+    
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/reasoning/jobs/{job['id']}",
+        "websocket_url": f"/ws/reasoning/jobs/{job['id']}",
+        "queue_depth": reasoning_jobs.queue_depth()
+    }
+
+@app.get("/api/reasoning/jobs/{job_id}")
+async def get_reasoning_job(job_id: str, current_user: Optional[User] = Depends(get_optional_user)):
+    """Get the status and, once finished, the result of a reasoning job"""
+    job = await reasoning_jobs.get(job_id)
+    if not job or not owns_job(job, current_user):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "success": True,
+        "job": job
+    }
+
+@app.websocket("/ws/reasoning/jobs/{job_id}")
+async def reasoning_job_updates(websocket: WebSocket, job_id: str):
+    """Push job status changes until the job completes or fails. Authenticate with ?token= or an Authorization header."""
+    current_user = await get_websocket_user(websocket)
+    await websocket.accept()
+    try:
+        last_status = None
+        while True:
+            job = await reasoning_jobs.get(job_id)
+            if not job or not owns_job(job, current_user):
+                await websocket.send_json({"success": False, "error": "Job not found"})
+                break
+            
+            if job["status"] != last_status:
+                await websocket.send_json({"success": True, "job": job})
+                last_status = job["status"]
+            
+            if job["status"] in TERMINAL_STATUSES:
+                break
+            
+            await reasoning_jobs.wait_for_update(job_id, timeout=1.0)
+        
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
 @app.get("/api/pricing")
 async def get_pricing():
     """Get pricing plans and features"""
@@ -834,9 +1054,10 @@ async def create_checkout(request: dict, current_user: User = Depends(get_curren
             if not customer_result['success']:
                 raise HTTPException(status_code=500, detail="Failed to create customer")
             
-            # Update user with Stripe customer ID
-            current_user.stripe_customer_id = customer_result['customer_id']
+            # Update user with Stripe customer ID (current_user is not attached to this session)
+            db.query(User).filter(User.id == current_user.id).update({"stripe_customer_id": customer_result['customer_id']})
             db.commit()
+            current_user.stripe_customer_id = customer_result['customer_id']
         
         # Create checkout session
         success_url = request.get('success_url', 'https://filmfusion.app/dashboard?payment=success')
@@ -1196,38 +1417,15 @@ def detect_plan_from_price_id(price_id: str) -> str:
     return 'free'  # Default fallback
 
 @app.get("/api/admin/dashboard")
-async def get_admin_dashboard(admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
+async def get_admin_dashboard(admin_user: User = Depends(get_admin_user)):
     """Get admin dashboard overview"""
     try:
-        # System statistics
-        system_stats = get_system_stats(db)
-        
-        # Recent activity
-        recent_users = db.query(User).order_by(User.created_at.desc()).limit(5).all()
-        recent_projects = db.query(Project).order_by(Project.created_at.desc()).limit(5).all()
-        recent_renders = db.query(RenderJob).order_by(RenderJob.created_at.desc()).limit(5).all()
-        
-        # Revenue data
-        total_revenue = db.query(func.sum(Payment.amount)).filter(Payment.status == "succeeded").scalar() or 0
-        monthly_revenue = db.query(func.sum(Payment.amount)).filter(
-            Payment.status == "succeeded",
-            Payment.created_at >= func.date_trunc('month', func.now())
-        ).scalar() or 0
+        # Served from a snapshot refreshed in the background, not counted per request
+        snapshot = await admin_stats.get_snapshot()
         
         return {
             "success": True,
-            "dashboard": {
-                "system_stats": system_stats,
-                "revenue": {
-                    "total": total_revenue / 100,  # Convert from cents
-                    "monthly": monthly_revenue / 100
-                },
-                "recent_activity": {
-                    "users": [{"id": u.id, "username": u.username, "email": u.email, "created_at": u.created_at} for u in recent_users],
-                    "projects": [{"id": p.id, "name": p.name, "status": p.status, "created_at": p.created_at} for p in recent_projects],
-                    "renders": [{"id": r.id, "status": r.status, "created_at": r.created_at} for r in recent_renders]
-                }
-            }
+            "dashboard": snapshot
         }
     except Exception as e:
         error_handler.log_error(e, {"endpoint": "/api/admin/dashboard", "admin_id": admin_user.id})
@@ -1238,13 +1436,19 @@ async def get_all_users_admin(
     skip: int = 0, 
     limit: int = 50, 
     search: str = None,
+    cursor: str = None,
     admin_user: User = Depends(get_admin_user), 
     db: Session = Depends(get_db)
 ):
-    """Get all users with pagination and search"""
+    """Get all users with pagination and search. Pass cursor (next_cursor/prev_cursor) to page by keyset."""
     try:
-        users = get_all_users(db, skip=skip, limit=limit, search=search)
-        total_count = get_user_count(db)
+        page = Keyset(User, limit, cursor, skip)
+        users, pagination = page.page(get_all_users(db, search=search, page=page))
+        if cursor is None:
+            # Counting is only done for offset paging; cursor pages skip the full-table count
+            total_count = get_user_count(db)
+            pagination.update({"total": total_count, "skip": skip})
+        stats = get_user_stats_map(db, [user.id for user in users])
         
         return {
             "success": True,
@@ -1262,16 +1466,14 @@ async def get_all_users_admin(
                     "subscription_status": user.subscription_status,
                     "created_at": user.created_at,
                     "last_login": user.last_login,
-                    "login_count": user.login_count
+                    "login_count": user.login_count,
+                    "stats": stats.get(user.id)
                 } for user in users
             ],
-            "pagination": {
-                "total": total_count,
-                "skip": skip,
-                "limit": limit,
-                "has_more": skip + limit < total_count
-            }
+            "pagination": pagination
         }
+    except HTTPException:
+        raise
     except Exception as e:
         error_handler.log_error(e, {"endpoint": "/api/admin/users", "admin_id": admin_user.id})
         raise HTTPException(status_code=500, detail=str(e))
@@ -1350,21 +1552,7 @@ async def deactivate_user_admin(
         error_handler.log_error(e, {"endpoint": "/api/admin/users/deactivate", "admin_id": admin_user.id})
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_system_stats(db: Session):
-    """Get system statistics"""
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    total_projects = db.query(Project).count()
-    total_renders = db.query(RenderJob).count()
-    
-    return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_projects": total_projects,
-        "total_renders": total_renders
-    }
-
-def get_all_users(db: Session, skip: int = 0, limit: int = 50, search: str = None):
+def get_all_users(db: Session, skip: int = 0, limit: int = 50, search: str = None, page: Keyset = None):
     """Get all users with pagination and search"""
     query = db.query(User)
     
@@ -1373,6 +1561,8 @@ def get_all_users(db: Session, skip: int = 0, limit: int = 50, search: str = Non
             (User.username.ilike(f"%{search}%")) | (User.email.ilike(f"%{search}%"))
         )
     
+    if page is not None:
+        return page.apply(query).all()
     return query.offset(skip).limit(limit).all()
 
 def get_user_count(db: Session):
@@ -1453,7 +1643,7 @@ async def send_upcoming_invoice_email(email: str, full_name: str, amount: float,
         logger.warning(f"Failed to send upcoming invoice email to {email}: {str(e)}")
 
 @app.post("/api/support/tickets")
-async def create_ticket(request: dict, db: Session = Depends(get_db)):
+async def create_ticket(request: dict, db: AsyncSession = Depends(get_async_db)):
     """Create a new support ticket"""
     try:
         # Get user info if authenticated
@@ -1465,7 +1655,7 @@ async def create_ticket(request: dict, db: Session = Depends(get_db)):
                 payload = verify_token(token)
                 if payload:
                     user_id = int(payload.get('sub'))
-                    user = db.query(User).filter(User.id == user_id).first()
+                    user = await get_user_by_id_async(db, user_id)
                     if user:
                         user_name = user.full_name or user.username
         except:
@@ -1484,7 +1674,7 @@ async def create_ticket(request: dict, db: Session = Depends(get_db)):
         if not ticket_data['subject'] or not ticket_data['description'] or not ticket_data['user_email']:
             raise HTTPException(status_code=400, detail="Subject, description, and email are required")
         
-        ticket = create_support_ticket(db, ticket_data)
+        ticket = await create_support_ticket_async(db, ticket_data)
         
         # Send confirmation email
         try:
@@ -1513,10 +1703,10 @@ async def create_ticket(request: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/support/tickets")
-async def get_user_support_tickets(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_support_tickets(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get current user's support tickets"""
     try:
-        tickets = get_user_tickets(db, current_user.id)
+        tickets = await get_user_tickets_async(db, current_user.id)
         
         return {
             "success": True,
@@ -1538,10 +1728,10 @@ async def get_user_support_tickets(current_user: User = Depends(get_current_user
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/support/tickets/{ticket_id}")
-async def get_ticket_details(ticket_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_ticket_details(ticket_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get ticket details and responses"""
     try:
-        ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
+        ticket = await get_ticket_async(db, ticket_id)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
         
@@ -1549,7 +1739,7 @@ async def get_ticket_details(ticket_id: int, current_user: User = Depends(get_cu
         if ticket.user_id != current_user.id and not current_user.is_admin:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        responses = get_ticket_responses(db, ticket_id, include_internal=current_user.is_admin)
+        responses = await get_ticket_responses_async(db, ticket_id, include_internal=current_user.is_admin)
         
         return {
             "success": True,
@@ -1584,10 +1774,10 @@ async def get_ticket_details(ticket_id: int, current_user: User = Depends(get_cu
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/support/tickets/{ticket_id}/responses")
-async def add_response_to_ticket(ticket_id: int, request: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def add_response_to_ticket(ticket_id: int, request: dict, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Add a response to a ticket"""
     try:
-        ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
+        ticket = await get_ticket_async(db, ticket_id)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
         
@@ -1607,7 +1797,7 @@ async def add_response_to_ticket(ticket_id: int, request: dict, current_user: Us
         if not response_data['message']:
             raise HTTPException(status_code=400, detail="Message is required")
         
-        response = add_ticket_response(db, response_data)
+        response = await add_ticket_response_async(db, response_data)
         
         # Send email notification
         try:
@@ -1649,13 +1839,15 @@ async def get_all_support_tickets(
     limit: int = 50,
     status: str = None,
     category: str = None,
+    cursor: str = None,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all support tickets for admin"""
     try:
-        tickets = get_support_tickets(db, skip=skip, limit=limit, status=status, category=category)
-        stats = get_ticket_stats(db)
+        page = Keyset(SupportTicket, limit, cursor, skip)
+        tickets, pagination = page.page(await get_support_tickets_async(db, status=status, category=category, page=page))
+        stats = await get_ticket_stats_async(db)
         
         return {
             "success": True,
@@ -1675,8 +1867,11 @@ async def get_all_support_tickets(
                     "last_response_at": ticket.last_response_at.isoformat() if ticket.last_response_at else None
                 } for ticket in tickets
             ],
-            "stats": stats
+            "stats": stats,
+            "pagination": pagination
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1685,7 +1880,7 @@ async def update_support_ticket_status(
     ticket_id: int,
     request: dict,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update ticket status"""
     try:
@@ -1695,7 +1890,7 @@ async def update_support_ticket_status(
         if status not in ['open', 'in_progress', 'waiting_response', 'resolved', 'closed']:
             raise HTTPException(status_code=400, detail="Invalid status")
         
-        ticket = update_ticket_status(db, ticket_id, status, resolution_notes)
+        ticket = await update_ticket_status_async(db, ticket_id, status, resolution_notes)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
         
@@ -1731,7 +1926,7 @@ async def assign_support_ticket(
     ticket_id: int,
     request: dict,
     admin_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Assign ticket to an admin"""
     try:
@@ -1741,11 +1936,11 @@ async def assign_support_ticket(
             raise HTTPException(status_code=400, detail="Admin ID is required")
         
         # Verify the admin exists and is actually an admin
-        target_admin = db.query(User).filter(User.id == admin_id, User.is_admin == True).first()
-        if not target_admin:
+        target_admin = await get_user_by_id_async(db, admin_id)
+        if not target_admin or not target_admin.is_admin:
             raise HTTPException(status_code=400, detail="Invalid admin ID")
         
-        ticket = assign_ticket(db, ticket_id, admin_id)
+        ticket = await assign_ticket_async(db, ticket_id, admin_id)
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
         
@@ -1838,13 +2033,16 @@ async def get_moderation_reports(
     limit: int = 50,
     status: str = None,
     severity: str = None,
+    cursor: str = None,
     admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get content reports for moderation"""
     try:
-        reports = get_content_reports(db, skip=skip, limit=limit, status=status, severity=severity)
+        page = Keyset(ContentReport, limit, cursor, skip)
+        reports, pagination = page.page(get_content_reports(db, status=status, severity=severity, page=page))
         stats = get_moderation_stats(db)
+        content = load_moderated_content(db, reports)
         
         # Enrich reports with content details
         enriched_reports = []
@@ -1869,7 +2067,7 @@ async def get_moderation_reports(
             
             # Add content details
             if report.content_type == 'project':
-                project = db.query(Project).filter(Project.id == report.content_id).first()
+                project = content.get(('project', report.content_id))
                 if project:
                     report_dict['content_details'] = {
                         'title': project.name,
@@ -1877,7 +2075,7 @@ async def get_moderation_reports(
                         'owner': project.owner.username if project.owner else 'Unknown'
                     }
             elif report.content_type == 'user':
-                user = db.query(User).filter(User.id == report.content_id).first()
+                user = content.get(('user', report.content_id))
                 if user:
                     report_dict['content_details'] = {
                         'username': user.username,
@@ -1890,8 +2088,11 @@ async def get_moderation_reports(
         return {
             "success": True,
             "reports": enriched_reports,
-            "stats": stats
+            "stats": stats,
+            "pagination": pagination
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1962,12 +2163,14 @@ async def get_moderation_actions_list(
     limit: int = 50,
     target_type: str = None,
     status: str = None,
+    cursor: str = None,
     admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get moderation actions"""
     try:
-        actions = get_moderation_actions(db, skip=skip, limit=limit, target_type=target_type, status=status)
+        page = Keyset(ModerationAction, limit, cursor, skip)
+        actions, pagination = page.page(get_moderation_actions(db, target_type=target_type, status=status, page=page))
         
         return {
             "success": True,
@@ -1988,8 +2191,11 @@ async def get_moderation_actions_list(
                     "revoked_at": action.revoked_at.isoformat() if action.revoked_at else None,
                     "revoked_by": action.revoked_by.username if action.revoked_by else None
                 } for action in actions
-            ]
+            ],
+            "pagination": pagination
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1999,12 +2205,15 @@ async def get_content_flags_list(
     limit: int = 50,
     status: str = None,
     flag_type: str = None,
+    cursor: str = None,
     admin_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get content flags"""
     try:
-        flags = get_content_flags(db, skip=skip, limit=limit, status=status, flag_type=flag_type)
+        page = Keyset(ContentFlag, limit, cursor, skip)
+        flags, pagination = page.page(get_content_flags(db, status=status, flag_type=flag_type, page=page))
+        content = load_moderated_content(db, flags)
         
         enriched_flags = []
         for flag in flags:
@@ -2026,7 +2235,7 @@ async def get_content_flags_list(
             
             # Add content preview
             if flag.content_type == 'project':
-                project = db.query(Project).filter(Project.id == flag.content_id).first()
+                project = content.get(('project', flag.content_id))
                 if project:
                     flag_dict['content_preview'] = {
                         'title': project.name,
@@ -2037,8 +2246,11 @@ async def get_content_flags_list(
         
         return {
             "success": True,
-            "flags": enriched_flags
+            "flags": enriched_flags,
+            "pagination": pagination
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2053,44 +2265,36 @@ async def scan_content_for_moderation(
         content_type = request.get('content_type', 'all')
         limit = request.get('limit', 100)
         
-        scanned_count = 0
-        flagged_count = 0
+        scan = {"scanned_count": 0, "flagged_count": 0, "failed_count": 0}
         
         if content_type in ['all', 'projects']:
-            # Scan recent projects
-            projects = db.query(Project).order_by(Project.created_at.desc()).limit(limit).all()
-            
-            for project in projects:
-                # Check if already flagged
-                existing_flag = db.query(ContentFlag).filter(
-                    ContentFlag.content_type == 'project',
-                    ContentFlag.content_id == project.id,
-                    ContentFlag.status == 'active'
-                ).first()
-                
-                if not existing_flag:
-                    flag = auto_moderate_project(db, project)
-                    if flag:
-                        flagged_count += 1
-                    scanned_count += 1
+            # Scan projects changed since the last scan, in batched moderation calls
+            scan = await moderation_engine.scan_projects(db, limit)
         
         return {
             "success": True,
-            "scanned_count": scanned_count,
-            "flagged_count": flagged_count,
-            "message": f"Scanned {scanned_count} items, flagged {flagged_count} for review"
+            **scan,
+            "message": f"Scanned {scan['scanned_count']} items, flagged {scan['flagged_count']} for review"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/admin/user-stats/reconcile")
+async def reconcile_user_stats_admin(admin_user: User = Depends(get_admin_user)):
+    """Recount every user's stats rollup now and repair drift"""
+    try:
+        result = await asyncio.to_thread(user_stats_reconciler.reconcile_all)
+        return {"success": True, **result}
+    except Exception as e:
+        error_handler.log_error(e, {"endpoint": "/api/admin/user-stats/reconcile", "admin_id": admin_user.id})
+        raise HTTPException(status_code=500, detail=str(e))
+
 async def apply_content_removal(db: Session, content_type: str, content_id: int):
     """Apply content removal action"""
     try:
         if content_type == 'project':
-            project = db.query(Project).filter(Project.id == content_id).first()
-            if project:
-                project.status = 'removed'
-                db.commit()
+            # Through update_project so the owner's user_stats follow the status change
+            update_project(db, content_id, status='removed')
         # Add other content types as needed
     except Exception as e:
         logger.error(f"Failed to remove content {content_type}:{content_id}: {str(e)}")
@@ -0,0 +1,371 @@
+"""Baseline schema; add prompt-cache and latency columns to ai_sessions
+
+On an empty database this revision first creates the schema as create_tables() built it
+before migrations existed, so new and existing databases take the same path from here on.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def create_baseline() -> None:
+    """The tables and indexes as create_tables() built them before migrations existed"""
+    op.create_table('blog_categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('slug', sa.String(), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('color', sa.String()),
+        sa.Column('meta_title', sa.String()),
+        sa.Column('meta_description', sa.Text()),
+        sa.Column('language', sa.String()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_blog_categories_id', 'blog_categories', ['id'], unique=False)
+    op.create_index('ix_blog_categories_slug', 'blog_categories', ['slug'], unique=True)
+
+    op.create_table('blog_tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('slug', sa.String(), nullable=False),
+        sa.Column('color', sa.String()),
+        sa.Column('language', sa.String()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_blog_tags_id', 'blog_tags', ['id'], unique=False)
+    op.create_index('ix_blog_tags_slug', 'blog_tags', ['slug'], unique=True)
+
+    op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String()),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('is_premium', sa.Boolean()),
+        sa.Column('is_admin', sa.Boolean()),
+        sa.Column('role', sa.String()),
+        sa.Column('permissions', sa.JSON()),
+        sa.Column('stripe_customer_id', sa.String()),
+        sa.Column('stripe_subscription_id', sa.String()),
+        sa.Column('subscription_status', sa.String()),
+        sa.Column('subscription_plan', sa.String()),
+        sa.Column('subscription_period_start', sa.DateTime(timezone=True)),
+        sa.Column('subscription_period_end', sa.DateTime(timezone=True)),
+        sa.Column('monthly_ai_calls', sa.Integer()),
+        sa.Column('monthly_render_minutes', sa.Integer()),
+        sa.Column('monthly_storage_gb', sa.Float()),
+        sa.Column('usage_reset_date', sa.DateTime(timezone=True)),
+        sa.Column('last_login', sa.DateTime(timezone=True)),
+        sa.Column('login_count', sa.Integer()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stripe_customer_id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('blog_posts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('slug', sa.String(), nullable=False),
+        sa.Column('excerpt', sa.Text()),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('featured_image_url', sa.String()),
+        sa.Column('meta_title', sa.String()),
+        sa.Column('meta_description', sa.Text()),
+        sa.Column('meta_keywords', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('published_at', sa.DateTime(timezone=True)),
+        sa.Column('featured', sa.Boolean()),
+        sa.Column('view_count', sa.Integer()),
+        sa.Column('like_count', sa.Integer()),
+        sa.Column('share_count', sa.Integer()),
+        sa.Column('language', sa.String()),
+        sa.Column('translated_from_id', sa.Integer()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('author_id', sa.Integer()),
+        sa.Column('category_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['category_id'], ['blog_categories.id']),
+        sa.ForeignKeyConstraint(['translated_from_id'], ['blog_posts.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_blog_posts_id', 'blog_posts', ['id'], unique=False)
+    op.create_index('ix_blog_posts_slug', 'blog_posts', ['slug'], unique=True)
+
+    op.create_table('content_flags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('flag_type', sa.String(), nullable=False),
+        sa.Column('flag_reason', sa.String(), nullable=False),
+        sa.Column('confidence_score', sa.Float()),
+        sa.Column('flagged_by_system', sa.String()),
+        sa.Column('flagged_by_user_id', sa.Integer()),
+        sa.Column('status', sa.String()),
+        sa.Column('reviewed_by_id', sa.Integer()),
+        sa.Column('reviewed_at', sa.DateTime(timezone=True)),
+        sa.Column('review_notes', sa.Text()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.ForeignKeyConstraint(['flagged_by_user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['reviewed_by_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_content_flags_id', 'content_flags', ['id'], unique=False)
+
+    op.create_table('content_reports',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('report_type', sa.String(), nullable=False),
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('severity', sa.String()),
+        sa.Column('reporter_id', sa.Integer()),
+        sa.Column('reporter_email', sa.String()),
+        sa.Column('reporter_ip', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('reviewed_by_id', sa.Integer()),
+        sa.Column('reviewed_at', sa.DateTime(timezone=True)),
+        sa.Column('resolution', sa.String()),
+        sa.Column('resolution_notes', sa.Text()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.ForeignKeyConstraint(['reporter_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['reviewed_by_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_content_reports_id', 'content_reports', ['id'], unique=False)
+
+    op.create_table('payments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('stripe_payment_intent_id', sa.String()),
+        sa.Column('stripe_invoice_id', sa.String()),
+        sa.Column('amount', sa.Integer()),
+        sa.Column('currency', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('payment_type', sa.String()),
+        sa.Column('description', sa.Text()),
+        sa.Column('ai_calls_charged', sa.Integer()),
+        sa.Column('render_minutes_charged', sa.Integer()),
+        sa.Column('storage_gb_charged', sa.Float()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('paid_at', sa.DateTime(timezone=True)),
+        sa.Column('user_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stripe_payment_intent_id')
+    )
+    op.create_index('ix_payments_id', 'payments', ['id'], unique=False)
+
+    op.create_table('projects',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('status', sa.String()),
+        sa.Column('project_type', sa.String()),
+        sa.Column('duration', sa.Float()),
+        sa.Column('platform', sa.String()),
+        sa.Column('script_content', sa.Text()),
+        sa.Column('voiceover_settings', sa.JSON()),
+        sa.Column('timeline_data', sa.JSON()),
+        sa.Column('export_settings', sa.JSON()),
+        sa.Column('thumbnail_url', sa.String()),
+        sa.Column('video_url', sa.String()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('owner_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_projects_id', 'projects', ['id'], unique=False)
+
+    op.create_table('support_tickets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ticket_number', sa.String()),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('category', sa.String()),
+        sa.Column('priority', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('user_email', sa.String(), nullable=False),
+        sa.Column('user_name', sa.String()),
+        sa.Column('assigned_to_id', sa.Integer()),
+        sa.Column('resolved_at', sa.DateTime(timezone=True)),
+        sa.Column('resolution_notes', sa.Text()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('last_response_at', sa.DateTime(timezone=True)),
+        sa.Column('user_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['assigned_to_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_support_tickets_id', 'support_tickets', ['id'], unique=False)
+    op.create_index('ix_support_tickets_ticket_number', 'support_tickets', ['ticket_number'], unique=True)
+
+    op.create_table('ai_sessions',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('session_type', sa.String()),
+        sa.Column('model_used', sa.String()),
+        sa.Column('tokens_used', sa.Integer()),
+        sa.Column('reasoning_tokens', sa.Integer()),
+        sa.Column('cost', sa.Float()),
+        sa.Column('request_data', sa.JSON()),
+        sa.Column('response_data', sa.JSON()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('user_id', sa.Integer()),
+        sa.Column('project_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('blog_comments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('author_name', sa.String(), nullable=False),
+        sa.Column('author_email', sa.String(), nullable=False),
+        sa.Column('author_website', sa.String()),
+        sa.Column('status', sa.String()),
+        sa.Column('moderated_by_id', sa.Integer()),
+        sa.Column('moderated_at', sa.DateTime(timezone=True)),
+        sa.Column('parent_id', sa.Integer()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('post_id', sa.Integer()),
+        sa.Column('user_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['moderated_by_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['parent_id'], ['blog_comments.id']),
+        sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_blog_comments_id', 'blog_comments', ['id'], unique=False)
+
+    op.create_table('blog_post_tags',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id']),
+        sa.ForeignKeyConstraint(['tag_id'], ['blog_tags.id']),
+        sa.PrimaryKeyConstraint('post_id', 'tag_id')
+    )
+
+    op.create_table('moderation_actions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('action_type', sa.String(), nullable=False),
+        sa.Column('target_type', sa.String(), nullable=False),
+        sa.Column('target_id', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('severity', sa.String()),
+        sa.Column('duration', sa.Integer()),
+        sa.Column('moderator_id', sa.Integer(), nullable=False),
+        sa.Column('related_report_id', sa.Integer()),
+        sa.Column('status', sa.String()),
+        sa.Column('expires_at', sa.DateTime(timezone=True)),
+        sa.Column('revoked_at', sa.DateTime(timezone=True)),
+        sa.Column('revoked_by_id', sa.Integer()),
+        sa.Column('revoke_reason', sa.Text()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.ForeignKeyConstraint(['moderator_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['related_report_id'], ['content_reports.id']),
+        sa.ForeignKeyConstraint(['revoked_by_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_moderation_actions_id', 'moderation_actions', ['id'], unique=False)
+
+    op.create_table('project_analytics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('views', sa.Integer()),
+        sa.Column('likes', sa.Integer()),
+        sa.Column('shares', sa.Integer()),
+        sa.Column('comments', sa.Integer()),
+        sa.Column('engagement_rate', sa.Float()),
+        sa.Column('watch_time', sa.Float()),
+        sa.Column('click_through_rate', sa.Float()),
+        sa.Column('conversion_rate', sa.Float()),
+        sa.Column('retention_rate', sa.Float()),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('project_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_project_analytics_id', 'project_analytics', ['id'], unique=False)
+
+    op.create_table('render_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('status', sa.String()),
+        sa.Column('progress', sa.Integer()),
+        sa.Column('current_step', sa.String()),
+        sa.Column('error_message', sa.Text()),
+        sa.Column('export_format', sa.String()),
+        sa.Column('resolution', sa.String()),
+        sa.Column('quality', sa.String()),
+        sa.Column('output_url', sa.String()),
+        sa.Column('file_size', sa.Integer()),
+        sa.Column('duration', sa.Float()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True)),
+        sa.Column('completed_at', sa.DateTime(timezone=True)),
+        sa.Column('user_id', sa.Integer()),
+        sa.Column('project_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('ticket_responses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('is_internal', sa.Boolean()),
+        sa.Column('is_from_admin', sa.Boolean()),
+        sa.Column('attachment_urls', sa.JSON()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('ticket_id', sa.Integer()),
+        sa.Column('author_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['ticket_id'], ['support_tickets.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ticket_responses_id', 'ticket_responses', ['id'], unique=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("users"):
+        create_baseline()
+
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("ai_sessions")}
+    if "cached_tokens" not in columns:
+        op.add_column("ai_sessions", sa.Column("cached_tokens", sa.Integer(), server_default="0"))
+    if "latency_ms" not in columns:
+        op.add_column("ai_sessions", sa.Column("latency_ms", sa.Float()))
+
+
+def downgrade() -> None:
+    # The baseline tables stay; they cannot be told apart from ones the app created itself
+    op.drop_column("ai_sessions", "latency_ms")
+    op.drop_column("ai_sessions", "cached_tokens")
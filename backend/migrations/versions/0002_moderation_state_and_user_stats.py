@@ -0,0 +1,63 @@
+"""Create moderation_states, moderation_watermarks and user_stats
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_STATS_COUNTERS = (
+    "projects_total", "projects_draft", "projects_in_progress", "projects_completed",
+    "renders_total", "renders_queued", "renders_processing", "renders_completed", "renders_failed",
+    "ai_calls", "tokens_used"
+)
+
+
+def upgrade() -> None:
+    # The app's create_tables() may have created these already
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "moderation_states" not in tables:
+        op.create_table(
+            "moderation_states",
+            sa.Column("content_type", sa.String(), primary_key=True),
+            sa.Column("content_id", sa.Integer(), primary_key=True),
+            sa.Column("fingerprint", sa.String(64), nullable=False),
+            sa.Column("flagged", sa.Boolean()),
+            sa.Column("content_updated_at", sa.DateTime(timezone=True)),
+            sa.Column("last_scanned_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+    if "moderation_watermarks" not in tables:
+        op.create_table(
+            "moderation_watermarks",
+            sa.Column("content_type", sa.String(), primary_key=True),
+            sa.Column("last_updated_at", sa.DateTime(timezone=True)),
+            sa.Column("last_content_id", sa.Integer()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+    if "user_stats" not in tables:
+        op.create_table(
+            "user_stats",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            *(sa.Column(name, sa.Integer(), nullable=False, server_default="0") for name in USER_STATS_COUNTERS),
+            sa.Column("render_minutes", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("reconciled_at", sa.DateTime(timezone=True))
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("user_stats")
+    op.drop_table("moderation_watermarks")
+    op.drop_table("moderation_states")
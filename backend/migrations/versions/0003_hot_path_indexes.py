@@ -0,0 +1,64 @@
+"""Index the foreign keys, filters and sort keys of the hot query paths
+
+On Postgres every index is built CONCURRENTLY, outside a transaction, so writes are not
+blocked while it builds. An index left INVALID by an earlier failed build is dropped and
+rebuilt.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same names as the models declare, so check_indexes() finds them
+INDEXES = [
+    ("ix_projects_owner_id", "projects", ["owner_id"]),
+    ("ix_render_jobs_user_id", "render_jobs", ["user_id"]),
+    ("ix_ai_sessions_user_id", "ai_sessions", ["user_id"]),
+    ("ix_payments_user_id", "payments", ["user_id"]),
+    ("ix_payments_status_created_at", "payments", ["status", "created_at"]),
+    ("ix_users_created_at_id", "users", ["created_at", "id"]),
+    ("ix_support_tickets_created_at_id", "support_tickets", ["created_at", "id"]),
+    ("ix_support_tickets_status_created_at_id", "support_tickets", ["status", "created_at", "id"]),
+    ("ix_support_tickets_user_id_created_at", "support_tickets", ["user_id", "created_at"]),
+    ("ix_content_reports_created_at_id", "content_reports", ["created_at", "id"]),
+    ("ix_content_reports_status_created_at_id", "content_reports", ["status", "created_at", "id"]),
+    ("ix_content_reports_severity_created_at_id", "content_reports", ["severity", "created_at", "id"]),
+    ("ix_moderation_actions_created_at_id", "moderation_actions", ["created_at", "id"]),
+    ("ix_content_flags_created_at_id", "content_flags", ["created_at", "id"]),
+    ("ix_content_flags_content_status", "content_flags", ["content_type", "content_id", "status"])
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        invalid = set(op.get_bind().execute(sa.text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+        )).scalars())
+        for name, table, columns in INDEXES:
+            if name in invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=concurrently, if_exists=True)
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, insert, literal, or_, tuple_
+from sqlalchemy.orm import Session
+
+from ai_client import ai_client
+from database import SessionLocal, Project, ContentFlag, ModerationState, ModerationWatermark, stats_cache, upsert_statement
+from moderation_prefilter import moderation_prefilter
+from monitoring import logger
+from resilience import resilient_caller
+
+# Moderation engine configuration
+MODERATION_CONFIG = {
+    "model": os.getenv("MODERATION_MODEL", "omni-moderation-latest"),
+    "batch_size": int(os.getenv("MODERATION_BATCH_SIZE", "32")),  # Inputs per moderation request
+    "max_concurrency": int(os.getenv("MODERATION_MAX_CONCURRENCY", "4")),
+    "max_chars": 20000,  # Longer texts are truncated before sending
+    "scan_interval": int(os.getenv("MODERATION_SCAN_INTERVAL", "300")),  # Seconds between background scans, 0 disables
+    "scan_page_size": int(os.getenv("MODERATION_SCAN_PAGE_SIZE", "500")),
+    # Rows committed late can carry an updated_at behind the watermark; this window behind it is re-read
+    "scan_overlap_seconds": int(os.getenv("MODERATION_SCAN_OVERLAP_SECONDS", "300")),
+    "scan_max_pages": 20  # Per background run
+}
+
+
+def project_text(project: Project) -> str:
+    """The text of a project that gets moderated"""
+    return f"{project.name}\n{project.description or ''}\n{project.script_content or ''}"
+
+
+def content_fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def flag_from_result(content_type: str, content_id: int, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """ContentFlag row for a flagged moderation result, or None"""
+    if not result.get("flagged"):
+        return None
+    flagged_categories = [category for category, flagged in result["categories"].items() if flagged]
+    if not flagged_categories:
+        return None
+    return {
+        "content_type": content_type,
+        "content_id": content_id,
+        "flag_type": "automated",
+        "flag_reason": f"ai_detected_{flagged_categories[0]}",
+        "confidence_score": max(result["category_scores"].values()),
+        "flagged_by_system": "openai_moderation",
+        "status": "active"
+    }
+
+
+class ModerationEngine:
+    """Moderate many texts with batched, concurrent moderation requests, rescanning only what changed"""
+
+    def __init__(self, config: Dict[str, Any] = MODERATION_CONFIG):
+        self.config = config
+        self.redis = None
+        self._scanner: Optional[asyncio.Task] = None
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection to elect the background scanner"""
+        self.redis = redis_client
+
+    async def moderate_texts(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Moderate texts in array batches. Results line up with texts; a failed batch yields error results."""
+        size = self.config["batch_size"]
+        batches = [texts[start:start + size] for start in range(0, len(texts), size)]
+        semaphore = asyncio.Semaphore(self.config["max_concurrency"])
+
+        async def moderate_batch(batch: List[str]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    response = await resilient_caller.call(
+                        self.config["model"],
+                        lambda: ai_client.client.moderations.create(
+                            model=self.config["model"],
+                            input=[text[:self.config["max_chars"]] for text in batch]
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"Moderation batch of {len(batch)} failed: {str(e)}")
+                    return [{"flagged": False, "error": str(e)} for _ in batch]
+
+            return [
+                {
+                    "flagged": result.flagged,
+                    "categories": result.categories.model_dump(),
+                    "category_scores": result.category_scores.model_dump()
+                }
+                for result in response.results
+            ]
+
+        results = await asyncio.gather(*(moderate_batch(batch) for batch in batches))
+        return [result for batch_results in results for result in batch_results]
+
+    async def scan_projects(self, db: Session, limit: int = 100) -> Dict[str, Any]:
+        """Moderate projects changed since the watermark whose text actually changed.
+
+        Projects are taken in (updated_at, id) order after the stored watermark. A project whose
+        fingerprint matches its last scan is skipped without a moderation call. The watermark only
+        advances past projects that were handled, so a failed batch is retried on the next scan.
+        Projects in the overlap window behind the watermark that were never scanned at their current
+        updated_at, because their transaction committed after the watermark passed them, are picked
+        up as well. Reading and writing the page run in a worker thread; only the moderation calls
+        run on the loop.
+        """
+        started = time.time()
+        page = await asyncio.to_thread(self._load_page, db, limit)
+        rows, fingerprints, already_flagged = page["rows"], page["fingerprints"], page["already_flagged"]
+
+        # Riskiest content goes first; content the local pre-filter clears skips the remote call,
+        # apart from a sample spot-checked to measure what the pre-filter misses
+        triage = moderation_prefilter.triage(page["changed"], self.config["batch_size"])
+        to_moderate = triage["remote"]
+        cleared = set(triage["cleared"])
+
+        results = dict(zip(to_moderate, await self.moderate_texts([page["changed"][project_id] for project_id in to_moderate])))
+        for project_id in triage["spot_checked"]:
+            if "error" not in results[project_id]:
+                moderation_prefilter.record_spot_check(f"project {project_id}", results[project_id]["flagged"])
+
+        flags = []
+        scanned_states = []
+        new_watermark = None
+        now = datetime.now(timezone.utc)
+
+        def handle(project_id, project_changed_at) -> bool:
+            result = results.get(project_id)
+            if result is not None and "error" in result:
+                return False
+            if project_id in cleared:
+                # No moderation verdict to remember: without a state the project is triaged
+                # afresh on its next edit instead of being skipped as already moderated
+                return True
+            flag = flag_from_result('project', project_id, result) if result is not None else None
+            if flag:
+                flags.append(flag)
+            scanned_states.append({
+                "content_type": 'project',
+                "content_id": project_id,
+                "fingerprint": fingerprints[project_id],
+                "flagged": bool(flag) or project_id in already_flagged,
+                "content_updated_at": project_changed_at,
+                "last_scanned_at": now
+            })
+            return True
+
+        # Late rows sit behind the watermark already; one that fails is simply re-read next scan
+        late_failed = sum(not handle(project_id, project_changed_at) for project_id, project_changed_at in page["late"])
+        for project_id, project_changed_at in rows:
+            if not handle(project_id, project_changed_at):
+                break  # Leave the watermark before the first failure
+            new_watermark = (project_changed_at, project_id)
+
+        await asyncio.to_thread(self._save_page, db, flags, scanned_states, new_watermark)
+        if flags:
+            stats_cache.invalidate("moderation")
+
+        failed = len(rows) + len(page["late"]) - len(scanned_states) - len(cleared)
+        logger.info(
+            f"Moderation scan: {len(rows)} changed projects, {len(page['late'])} committed late, {len(to_moderate)} moderated, "
+            f"{len(triage['cleared'])} cleared locally, "
+            f"{len(flags)} flagged, {failed} left for retry in {time.time() - started:.2f}s"
+        )
+        return {
+            "scanned_count": len(rows) + len(page["late"]),
+            "late_count": len(page["late"]),
+            "moderated_count": len(to_moderate),
+            "prefilter_cleared_count": len(triage["cleared"]),
+            "unchanged_count": len(rows) + len(page["late"]) - len(page["changed"]),
+            "flagged_count": len(flags),
+            "failed_count": failed,
+            "caught_up": len(rows) < limit and failed == late_failed
+        }
+
+    def _load_page(self, db: Session, limit: int) -> Dict[str, Any]:
+        """The next page after the watermark, as plain data: (id, changed_at) rows, fingerprints,
+        the ids already carrying an active flag, and the text of those that need moderating"""
+        changed_at = func.coalesce(Project.updated_at, Project.created_at)
+
+        watermark = db.get(ModerationWatermark, 'project')
+        query = db.query(Project, changed_at)
+        late = []
+        if watermark is not None and watermark.last_updated_at is not None:
+            query = query.filter(
+                tuple_(changed_at, Project.id) > tuple_(literal(watermark.last_updated_at), literal(watermark.last_content_id))
+            )
+            late = self._late_projects(db, changed_at, watermark, limit)
+        projects = query.order_by(changed_at, Project.id).limit(limit).all()
+        project_ids = [project.id for project, _ in late + projects]
+
+        scanned = {
+            content_id: fingerprint for content_id, fingerprint in db.query(
+                ModerationState.content_id, ModerationState.fingerprint
+            ).filter(
+                ModerationState.content_type == 'project',
+                ModerationState.content_id.in_(project_ids)
+            )
+        } if project_ids else {}
+        already_flagged = {
+            content_id for (content_id,) in db.query(ContentFlag.content_id).filter(
+                ContentFlag.content_type == 'project',
+                ContentFlag.content_id.in_(project_ids),
+                ContentFlag.status == 'active'
+            )
+        } if project_ids else set()
+
+        texts = {project.id: project_text(project) for project, _ in late + projects}
+        fingerprints = {project_id: content_fingerprint(text) for project_id, text in texts.items()}
+        changed = {
+            project_id: texts[project_id] for project_id in project_ids
+            if project_id not in already_flagged
+            and texts[project_id].strip()
+            and scanned.get(project_id) != fingerprints[project_id]
+        }
+        db.rollback()  # End the read transaction; nothing is held open across the moderation calls
+        return {
+            "rows": [(project.id, project_changed_at) for project, project_changed_at in projects],
+            "late": [(project.id, project_changed_at) for project, project_changed_at in late],
+            "fingerprints": fingerprints,
+            "already_flagged": already_flagged,
+            "changed": changed
+        }
+
+    def _late_projects(self, db: Session, changed_at, watermark: ModerationWatermark, limit: int) -> List[Any]:
+        """Projects in the overlap window at or behind the watermark with no scan at their current
+        updated_at: rows whose transaction committed after a scan had already moved past them"""
+        window_start = watermark.last_updated_at - timedelta(seconds=self.config["scan_overlap_seconds"])
+        return db.query(Project, changed_at).outerjoin(
+            ModerationState,
+            and_(ModerationState.content_type == 'project', ModerationState.content_id == Project.id)
+        ).filter(
+            changed_at >= window_start,
+            tuple_(changed_at, Project.id) <= tuple_(literal(watermark.last_updated_at), literal(watermark.last_content_id)),
+            or_(ModerationState.content_id.is_(None), ModerationState.content_updated_at < changed_at)
+        ).order_by(changed_at, Project.id).limit(limit).all()
+
+    def _save_page(self, db: Session, flags: List[Dict[str, Any]], scanned_states: List[Dict[str, Any]], new_watermark):
+        if flags:
+            db.execute(insert(ContentFlag), flags)
+        if scanned_states:
+            upsert = upsert_statement(db, ModerationState).values(scanned_states)
+            db.execute(upsert.on_conflict_do_update(
+                index_elements=[ModerationState.content_type, ModerationState.content_id],
+                set_={
+                    "fingerprint": upsert.excluded.fingerprint,
+                    "flagged": upsert.excluded.flagged,
+                    "content_updated_at": upsert.excluded.content_updated_at,
+                    "last_scanned_at": upsert.excluded.last_scanned_at
+                }
+            ))
+        if new_watermark is not None:
+            db.merge(ModerationWatermark(
+                content_type='project', last_updated_at=new_watermark[0], last_content_id=new_watermark[1]
+            ))
+        db.commit()
+
+    async def start(self):
+        """Start the periodic background scan"""
+        if self.config["scan_interval"] > 0:
+            self._scanner = asyncio.create_task(self._scan_loop())
+
+    async def stop(self):
+        if self._scanner is not None:
+            self._scanner.cancel()
+            await asyncio.gather(self._scanner, return_exceptions=True)
+            self._scanner = None
+
+    async def _scan_loop(self):
+        while True:
+            await asyncio.sleep(self.config["scan_interval"])
+            if not await self._take_scan_lock():
+                continue
+            db = SessionLocal()
+            try:
+                for _ in range(self.config["scan_max_pages"]):
+                    scan = await self.scan_projects(db, self.config["scan_page_size"])
+                    if scan["caught_up"] or scan["failed_count"]:
+                        break
+            except Exception as e:
+                logger.error(f"Background moderation scan failed: {str(e)}")
+                db.rollback()
+            finally:
+                db.close()
+
+    async def _take_scan_lock(self) -> bool:
+        """Only one worker runs the periodic scan per interval"""
+        if self.redis is None:
+            return True
+        try:
+            return bool(await self.redis.set("moderation_scan:lock", "1", nx=True, ex=max(int(self.config["scan_interval"]) - 1, 1)))
+        except Exception as e:
+            logger.warning(f"Moderation scan lock failed, scanning anyway: {str(e)}")
+            return True
+
+
+# Global instance
+moderation_engine = ModerationEngine()
@@ -0,0 +1,203 @@
+import math
+import os
+import random
+import re
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, List
+
+from monitoring import logger
+
+# Local moderation pre-filter configuration
+PREFILTER_CONFIG = {
+    "enabled": os.getenv("MODERATION_PREFILTER_ENABLED", "true").lower() == "true",
+    # skip: low-risk content is not sent for remote moderation, apart from a spot-check sample
+    # shadow: everything is sent; low-risk content only measures what skip mode would miss
+    "mode": os.getenv("MODERATION_PREFILTER_MODE", "skip"),
+    "threshold": float(os.getenv("MODERATION_PREFILTER_THRESHOLD", "0.1")),
+    # Share of low-risk content moderated remotely anyway in skip mode, to catch what the pre-filter misses
+    "spot_check_rate": float(os.getenv("MODERATION_PREFILTER_SPOT_CHECK_RATE", "0.02")),
+    "terms_file": os.getenv("MODERATION_PREFILTER_TERMS_FILE"),  # One term per line, replaces the defaults
+    "term_weight": 0.5,  # Risk added per distinct matched term
+    "url_density_limit": 0.05,  # URLs per token above which content looks like link spam
+    "min_tokens_for_repetition": 20,
+    "repetition_limit": 0.3  # Share of tokens taken by the most common one
+}
+
+# Terms that commonly come with content the moderation model flags. Matches are whole words,
+# case-insensitive; a hit only sends the content for remote moderation, it never flags it.
+DEFAULT_TERMS = [
+    "kill yourself", "kys", "suicide", "self harm", "cutting myself", "murder", "shoot up",
+    "bomb threat", "terrorist", "massacre", "behead", "gore", "torture",
+    "porn", "nude", "nudes", "onlyfans", "xxx", "sex", "escort", "underage",
+    "nazi", "white power", "genocide", "ethnic cleansing",
+    "buy followers", "free crypto", "crypto giveaway", "double your money", "casino", "viagra",
+    "click here", "limited offer", "dm me", "whatsapp me"
+]
+
+PREFILTER_MODES = ("skip", "shadow")
+
+URL_PATTERN = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over a fixed term list: one pass over the text finds every term"""
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for term in terms:
+            term = term.strip().lower()
+            if term:
+                self._add(term)
+        self._build_failure_links()
+
+    def _add(self, term: str):
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(term)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> List[str]:
+        """Distinct terms occurring in text as whole words"""
+        text = text.lower()
+        found = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for term in self._output[state]:
+                start = end - len(term) + 1
+                before = text[start - 1] if start > 0 else " "
+                after = text[end + 1] if end + 1 < len(text) else " "
+                if not before.isalnum() and not after.isalnum() and term not in found:
+                    found.append(term)
+        return found
+
+
+class ModerationPrefilter:
+    """Cheap local risk score deciding which content needs a remote moderation call"""
+
+    def __init__(self, config: Dict[str, Any] = PREFILTER_CONFIG):
+        if config["mode"] not in PREFILTER_MODES:
+            raise ValueError(f"Unknown moderation pre-filter mode {config['mode']!r}, expected one of {', '.join(PREFILTER_MODES)}")
+        self.config = config
+        self.matcher = TermMatcher(self._load_terms())
+        self.evaluated = 0
+        self.sent_remote = 0
+        self.cleared = 0
+        self.remote_calls_saved = 0
+        self.spot_checked = 0
+        self.missed = 0  # Spot-checked low-risk content the remote model flagged
+
+    def _load_terms(self) -> List[str]:
+        path = self.config["terms_file"]
+        if not path:
+            return DEFAULT_TERMS
+        try:
+            with open(path, encoding="utf-8") as terms_file:
+                return [line for line in terms_file.read().splitlines() if line.strip() and not line.startswith("#")]
+        except OSError as e:
+            logger.warning(f"Could not read moderation term list {path}, using defaults: {str(e)}")
+            return DEFAULT_TERMS
+
+    def score(self, text: str) -> Dict[str, Any]:
+        """Risk in [0, 1] from matched terms, URL density and repeated-token spam"""
+        matched_terms = self.matcher.find(text)
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        url_count = len(URL_PATTERN.findall(text))
+        url_density = url_count / max(len(tokens), 1)
+
+        repetition = 0.0
+        if len(tokens) >= self.config["min_tokens_for_repetition"]:
+            repetition = Counter(tokens).most_common(1)[0][1] / len(tokens)
+
+        risk = len(matched_terms) * self.config["term_weight"]
+        if url_density > self.config["url_density_limit"]:
+            risk += min(url_density / self.config["url_density_limit"], 4) * 0.1
+        if repetition > self.config["repetition_limit"]:
+            risk += min(repetition, 1.0) * 0.4
+
+        return {
+            "risk": round(min(risk, 1.0), 3),
+            "matched_terms": matched_terms,
+            "url_count": url_count,
+            "repetition": round(repetition, 3)
+        }
+
+    def triage(self, texts: Dict[Any, str], batch_size: int = 1) -> Dict[str, List[Any]]:
+        """Split keys into those to moderate remotely (riskiest first) and those the pre-filter clears.
+
+        Low-risk keys sampled for a spot check (all of them in shadow mode) are moderated after the
+        risky ones and listed under "spot_checked"; report their verdicts with record_spot_check().
+        batch_size is the inputs per moderation request, so savings are counted in requests.
+        """
+        if not self.config["enabled"]:
+            return {"remote": list(texts), "cleared": [], "spot_checked": []}
+
+        risks = {key: self.score(text)["risk"] for key, text in texts.items()}
+        risky = sorted((key for key, risk in risks.items() if risk >= self.config["threshold"]), key=lambda key: -risks[key])
+        low_risk = [key for key, risk in risks.items() if risk < self.config["threshold"]]
+
+        if self.config["mode"] == "shadow":
+            spot_checked, cleared = low_risk, []
+        else:
+            spot_checked, cleared = [], []
+            for key in low_risk:
+                (spot_checked if random.random() < self.config["spot_check_rate"] else cleared).append(key)
+
+        remote = risky + spot_checked
+        self.evaluated += len(texts)
+        self.sent_remote += len(remote)
+        self.cleared += len(cleared)
+        self.remote_calls_saved += math.ceil(len(texts) / batch_size) - math.ceil(len(remote) / batch_size)
+        return {"remote": remote, "cleared": cleared, "spot_checked": spot_checked}
+
+    def record_spot_check(self, key: Any, flagged: bool):
+        """Count the remote verdict on spot-checked low-risk content; a flag is a pre-filter miss"""
+        self.spot_checked += 1
+        if flagged:
+            self.missed += 1
+            logger.warning(f"Moderation pre-filter rated content low-risk that the remote model flagged: {key}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.config["enabled"],
+            "mode": self.config["mode"],
+            "threshold": self.config["threshold"],
+            "evaluated": self.evaluated,
+            "sent_remote": self.sent_remote,
+            "cleared": self.cleared,
+            "remote_calls_saved": self.remote_calls_saved,
+            "cleared_rate": self.cleared / self.evaluated if self.evaluated else 0.0,
+            "spot_check_rate": self.config["spot_check_rate"],
+            "spot_checked": self.spot_checked,
+            "missed": self.missed,
+            "miss_rate": self.missed / self.spot_checked if self.spot_checked else 0.0
+        }
+
+
+# Global instance
+moderation_prefilter = ModerationPrefilter()
@@ -13,6 +13,7 @@ from fastapi import Request, Response
 from sqlalchemy.orm import Session
 import json
 import asyncio
+from contextvars import ContextVar
 from pathlib import Path
 
 # Configure structured logging
@@ -27,6 +28,19 @@ logging.basicConfig(
 
 logger = logging.getLogger("filmfusion")
 
+# ASGI scope of the request being handled, used to attribute database sessions
+current_request: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_request", default=None)
+
+
+def route_label(scope: Optional[Dict[str, Any]]) -> str:
+    """Method plus matched route template for a request scope, so /projects/1 and /projects/2 share one entry"""
+    if scope is None:
+        return "background"
+    # The router adds the matched route to the scope; unmatched requests keep the raw path
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}"
+
 # Initialize Sentry for error monitoring
 def init_sentry():
     """Initialize Sentry error monitoring"""
@@ -72,6 +86,12 @@ def filter_sensitive_data(event, hint):
     
     return event
 
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
 class PerformanceMonitor:
     """Monitor application performance metrics"""
     
@@ -82,10 +102,28 @@ class PerformanceMonitor:
             "response_times": [],
             "active_connections": 0,
             "ai_calls_total": 0,
+            "ai_input_tokens": 0,
+            "ai_cached_tokens": 0,
+            "ai_latencies": [],
+            "ai_first_token_times": [],
+            "ai_cache_hits": 0,
+            "ai_cache_misses": 0,
+            "ai_calls_coalesced": 0,
+            "ai_calls_queued": 0,
+            "ai_calls_rejected": 0,
             "render_jobs_total": 0,
-            "database_queries": 0
+            "database_queries": 0,
+            "db_checkout_waits": [],
+            "db_pool_timeouts": 0,
+            "db_session_lifetimes": [],
+            "db_slow_sessions": {}
         }
         self.start_time = time.time()
+        self.db_pools = {}
+    
+    def bind_db_pool(self, pool, name: str = "sync"):
+        """Report live pool usage from a database engine's connection pool"""
+        self.db_pools[name] = pool
     
     def record_request(self, method: str, path: str, status_code: int, response_time: float, user_id: Optional[int] = None):
         """Record request metrics"""
@@ -109,15 +147,59 @@ class PerformanceMonitor:
                 "user_id": user_id
             })
     
-    def record_ai_call(self, model: str, tokens: int, cost: float = 0.0):
+    def record_ai_call(
+        self,
+        model: str,
+        tokens: int,
+        cost: float = 0.0,
+        input_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency: Optional[float] = None,
+        first_token: Optional[float] = None
+    ):
         """Record AI API call metrics"""
         self.metrics["ai_calls_total"] += 1
-        logger.info(f"AI call: {model} used {tokens} tokens", extra={
+        self.metrics["ai_input_tokens"] += input_tokens
+        self.metrics["ai_cached_tokens"] += cached_tokens
+        
+        # Keep only the last 1000 latencies, like response times
+        if latency is not None:
+            self.metrics["ai_latencies"] = (self.metrics["ai_latencies"] + [latency])[-1000:]
+        if first_token is not None:
+            self.metrics["ai_first_token_times"] = (self.metrics["ai_first_token_times"] + [first_token])[-1000:]
+        
+        logger.info(f"AI call: {model} used {tokens} tokens ({cached_tokens} of {input_tokens} input tokens cached)", extra={
             "model": model,
             "tokens": tokens,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "latency": latency,
             "cost": cost
         })
     
+    def record_ai_cache_lookup(self, hit: bool):
+        """Record an AI response cache hit or miss"""
+        if hit:
+            self.metrics["ai_cache_hits"] += 1
+        else:
+            self.metrics["ai_cache_misses"] += 1
+    
+    def record_ai_call_coalesced(self):
+        """Record an AI call that reused an identical in-flight call"""
+        self.metrics["ai_calls_coalesced"] += 1
+    
+    def record_ai_admission(self, wait: float, rejected: bool = False):
+        """Record how long an AI call waited for model capacity, or that it was turned away"""
+        if rejected:
+            self.metrics["ai_calls_rejected"] += 1
+            return
+        if wait > 0:
+            self.metrics["ai_calls_queued"] += 1
+        if wait > 10.0:  # 10 seconds
+            logger.warning(f"AI call queued for {wait:.2f}s waiting for model capacity", extra={
+                "queue_wait": wait
+            })
+    
     def record_render_job(self, status: str, duration: Optional[float] = None):
         """Record render job metrics"""
         self.metrics["render_jobs_total"] += 1
@@ -135,10 +217,64 @@ class PerformanceMonitor:
                 "duration": duration
             })
     
+    def record_db_checkout(self, wait: float, timed_out: bool = False):
+        """Record how long a request waited for a pooled database connection"""
+        if timed_out:
+            self.metrics["db_pool_timeouts"] += 1
+            logger.error(f"Database pool checkout timed out after {wait:.2f}s", extra={"checkout_wait": wait})
+            return
+        self.metrics["db_checkout_waits"] = (self.metrics["db_checkout_waits"] + [wait])[-1000:]
+        if wait > 1.0:
+            logger.warning(f"Database pool checkout waited {wait:.2f}s", extra={"checkout_wait": wait})
+    
+    def record_db_session(self, scope: Optional[Dict[str, Any]], lifetime: float, slow_threshold: float):
+        """Record how long a request held its database session"""
+        self.metrics["db_session_lifetimes"] = (self.metrics["db_session_lifetimes"] + [lifetime])[-1000:]
+        if lifetime > slow_threshold:
+            label = route_label(scope)
+            self.metrics["db_slow_sessions"][label] = self.metrics["db_slow_sessions"].get(label, 0) + 1
+            logger.warning(f"Database session held for {lifetime:.2f}s by {label}", extra={
+                "request": label,
+                "session_lifetime": lifetime
+            })
+    
+    def get_db_pool_stats(self) -> Dict[str, Any]:
+        """Pool occupancy plus checkout wait and session lifetime percentiles"""
+        waits = self.metrics["db_checkout_waits"]
+        lifetimes = self.metrics["db_session_lifetimes"]
+        stats = {
+            "checkout_wait_ms": {
+                "p50": round(_percentile(waits, 0.50) * 1000, 2),
+                "p95": round(_percentile(waits, 0.95) * 1000, 2),
+                "max": round(max(waits, default=0) * 1000, 2)
+            },
+            "checkout_timeouts": self.metrics["db_pool_timeouts"],
+            "session_lifetime_ms": {
+                "p50": round(_percentile(lifetimes, 0.50) * 1000, 2),
+                "p95": round(_percentile(lifetimes, 0.95) * 1000, 2),
+                "max": round(max(lifetimes, default=0) * 1000, 2)
+            },
+            # Requests that held a session past the slow threshold, worst first
+            "slow_sessions": dict(sorted(self.metrics["db_slow_sessions"].items(), key=lambda item: -item[1])[:10])
+        }
+        stats["pools"] = {
+            name: {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0)
+            }
+            for name, pool in self.db_pools.items()
+        }
+        return stats
+    
     def get_metrics(self) -> Dict[str, Any]:
         """Get current performance metrics"""
         uptime = time.time() - self.start_time
         avg_response_time = sum(self.metrics["response_times"]) / len(self.metrics["response_times"]) if self.metrics["response_times"] else 0
+        cache_lookups = self.metrics["ai_cache_hits"] + self.metrics["ai_cache_misses"]
+        ai_latencies = self.metrics["ai_latencies"]
+        first_token_times = self.metrics["ai_first_token_times"]
         
         return {
             "uptime_seconds": uptime,
@@ -147,8 +283,20 @@ class PerformanceMonitor:
             "error_rate": (self.metrics["requests_failed"] / max(self.metrics["requests_total"], 1)) * 100,
             "avg_response_time": avg_response_time,
             "ai_calls_total": self.metrics["ai_calls_total"],
+            "ai_cache_hits": self.metrics["ai_cache_hits"],
+            "ai_cache_misses": self.metrics["ai_cache_misses"],
+            "ai_cache_hit_rate": (self.metrics["ai_cache_hits"] / cache_lookups * 100) if cache_lookups > 0 else 0,
+            "ai_calls_coalesced": self.metrics["ai_calls_coalesced"],
+            "ai_input_tokens": self.metrics["ai_input_tokens"],
+            "ai_cached_tokens": self.metrics["ai_cached_tokens"],
+            "ai_prompt_cache_rate": (self.metrics["ai_cached_tokens"] / self.metrics["ai_input_tokens"] * 100) if self.metrics["ai_input_tokens"] > 0 else 0,
+            "avg_ai_latency": sum(ai_latencies) / len(ai_latencies) if ai_latencies else 0,
+            "avg_ai_first_token_time": sum(first_token_times) / len(first_token_times) if first_token_times else 0,
+            "ai_calls_queued": self.metrics["ai_calls_queued"],
+            "ai_calls_rejected": self.metrics["ai_calls_rejected"],
             "render_jobs_total": self.metrics["render_jobs_total"],
             "database_queries": self.metrics["database_queries"],
+            "db_pool": self.get_db_pool_stats(),
             "active_connections": self.metrics["active_connections"]
         }
 
@@ -348,6 +496,8 @@ async def monitoring_middleware(request: Request, call_next):
     
     # Log request
     request_logger.log_request(request, user_id)
+    # The route is only resolved inside call_next, so keep the scope and label it when a session closes
+    current_request.set(request.scope)
     
     try:
         response = await call_next(request)
@@ -0,0 +1,79 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+# Admin list pagination configuration
+PAGINATION_CONFIG = {
+    "max_limit": int(os.getenv("PAGINATION_MAX_LIMIT", "200"))
+}
+
+
+def encode_cursor(created_at: datetime, row_id: int, direction: str) -> str:
+    """Opaque cursor for the position of one row; direction is "next" (older) or "prev" (newer)"""
+    payload = json.dumps([created_at.isoformat(), row_id, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id, direction = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(row_id), direction
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+class Keyset:
+    """Newest-first pagination on (created_at, id), by cursor, or by skip when no cursor is given.
+
+    A cursor page seeks straight to its position through the (created_at, id) index, so every
+    page costs the same however deep it is, and rows inserted meanwhile do not shift it.
+    """
+
+    def __init__(self, model, limit: int, cursor: Optional[str] = None, skip: int = 0):
+        self.created_at = model.created_at
+        self.id = model.id
+        self.limit = max(1, min(limit, PAGINATION_CONFIG["max_limit"]))
+        self.position = decode_cursor(cursor) if cursor else None
+        self.skip = skip
+
+    @property
+    def backward(self) -> bool:
+        return self.position is not None and self.position[2] == "prev"
+
+    def apply(self, query):
+        """Order and limit a Query or select(); one extra row tells whether another page follows"""
+        newest_first = (self.created_at.desc(), self.id.desc())
+        if self.position is None:
+            return query.order_by(*newest_first).offset(self.skip).limit(self.limit + 1)
+
+        created_at, row_id, _ = self.position
+        key = tuple_(self.created_at, self.id)
+        at = tuple_(literal(created_at, self.created_at.type), literal(row_id))
+        if self.backward:
+            return query.filter(key > at).order_by(self.created_at.asc(), self.id.asc()).limit(self.limit + 1)
+        return query.filter(key < at).order_by(*newest_first).limit(self.limit + 1)
+
+    def page(self, rows: List[Any]) -> Tuple[List[Any], Dict[str, Any]]:
+        """The page's rows, newest first, and its pagination block"""
+        more = len(rows) > self.limit
+        rows = list(rows[:self.limit])
+        if self.backward:
+            rows.reverse()
+            has_next, has_prev = True, more
+        else:
+            has_next, has_prev = more, self.position is not None or self.skip > 0
+
+        return rows, {
+            "limit": self.limit,
+            "has_more": has_next,
+            "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id, "next") if has_next and rows else None,
+            "prev_cursor": encode_cursor(rows[0].created_at, rows[0].id, "prev") if has_prev and rows else None
+        }
@@ -0,0 +1,210 @@
+from typing import Any, Dict, List, Optional
+
+from agent_graph import PLANNER_GRAPH_INSTRUCTIONS
+
+
+class PromptTemplate:
+    """A versioned prompt: fixed instructions sent as a leading developer message, and a
+    user message carrying the per-request values.
+
+    Upstream prompt caching matches on the longest identical prefix, so everything that
+    does not change between requests belongs in the instructions.
+    """
+
+    def __init__(self, name: str, version: int, instructions: str, user_template: str):
+        self.name = name
+        self.version = version
+        self.instructions = instructions.strip()
+        self.user_template = user_template.strip()
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def render(self, values: Dict[str, Any], attachments: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Build the Responses API input. attachments (e.g. images) open the user message, ahead of
+        the values, so the same image analysed with different values still shares a prefix."""
+        user_text = self.user_template.format(**values)
+        user_content: Any = user_text
+        if attachments:
+            user_content = [*attachments, {"type": "input_text", "text": user_text}]
+        return [
+            {"role": "developer", "content": self.instructions},
+            {"role": "user", "content": user_content}
+        ]
+
+
+class PromptRegistry:
+    """Named prompt templates, keeping every registered version"""
+
+    def __init__(self):
+        self._templates: Dict[str, Dict[int, PromptTemplate]] = {}
+
+    def register(self, name: str, version: int, instructions: str, user_template: str) -> PromptTemplate:
+        template = PromptTemplate(name, version, instructions, user_template)
+        self._templates.setdefault(name, {})[version] = template
+        return template
+
+    def get(self, name: str, version: Optional[int] = None) -> PromptTemplate:
+        """Fetch a template, defaulting to its latest version"""
+        versions = self._templates.get(name)
+        if not versions:
+            raise KeyError(f"Unknown prompt template: {name}")
+        if version is None:
+            version = max(versions)
+        if version not in versions:
+            raise KeyError(f"Unknown version {version} of prompt template: {name}")
+        return versions[version]
+
+    def render(
+        self,
+        name: str,
+        values: Dict[str, Any],
+        version: Optional[int] = None,
+        attachments: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        return self.get(name, version).render(values, attachments)
+
+    def list_templates(self) -> Dict[str, List[int]]:
+        return {name: sorted(versions) for name, versions in self._templates.items()}
+
+
+# Global instance
+prompt_registry = PromptRegistry()
+
+prompt_registry.register("plan-video", 1, """
+Formatting re-enabled
+
+You are planning a comprehensive video creation strategy. The topic and requirements follow in the user message.
+
+Create a detailed multi-step plan including:
+1. Content strategy and messaging
+2. Visual style and aesthetic direction
+3. Script structure and key talking points
+4. Production timeline and milestones
+5. Distribution and promotion strategy
+6. Success metrics and KPIs
+
+Consider current trends, platform best practices, and audience psychology.
+""", """
+Plan a comprehensive video creation strategy for: {topic}
+
+Requirements:
+- Target audience: {audience}
+- Platform: {platform}
+- Duration: {duration}
+- Budget: {budget}
+- Goals: {goals}
+""")
+
+prompt_registry.register("analyze-content", 1, """
+Formatting re-enabled
+
+You analyze video content for optimization opportunities. The script, platform and any performance or competitor data follow in the user message.
+
+Provide detailed analysis including:
+1. Content strengths and weaknesses
+2. Audience engagement predictions
+3. Platform-specific optimization recommendations
+4. A/B testing suggestions
+5. Viral potential assessment
+6. Conversion optimization strategies
+
+Use data-driven insights and psychological principles to support recommendations.
+""", """
+**Target Platform:** {platform}
+**Current Performance:** {performance_data}
+**Competitor Analysis:** {competitor_data}
+**Script:** {script}
+""")
+
+prompt_registry.register("visual-analysis", 1, """
+Formatting re-enabled
+
+You analyze visual content for video production. The context, platform, audience and the visual itself follow in the user message.
+
+Provide detailed visual analysis including:
+1. Composition and design principles assessment
+2. Color psychology and brand alignment
+3. Accessibility and readability evaluation
+4. Platform-specific optimization suggestions
+5. A/B testing variations recommendations
+6. Emotional impact and engagement predictions
+
+Consider current design trends and platform best practices.
+""", """
+**Context:** {context}
+**Platform:** {platform}
+**Target Audience:** {audience}
+""")
+
+prompt_registry.register("debug-workflow", 1, """
+Formatting re-enabled
+
+You debug and optimize video creation workflows. The current workflow, issues, metrics and constraints follow in the user message.
+
+Provide comprehensive workflow optimization including:
+1. Root cause analysis of current issues
+2. Step-by-step workflow improvements
+3. Resource allocation optimization
+4. Quality assurance checkpoints
+5. Automation opportunities
+6. Scalability recommendations
+
+Focus on efficiency, quality, and maintainability.
+""", """
+**Current Workflow:** {workflow_steps}
+**Issues Encountered:** {issues}
+**Performance Metrics:** {metrics}
+**Resource Constraints:** {constraints}
+""")
+
+prompt_registry.register("multi-agent-planner", 1, """
+Formatting re-enabled
+
+Act as the master planner for a complex video project. The project, requirements, resources and timeline follow in the user message.
+
+Create a detailed execution plan that assigns specific tasks to specialized AI agents:
+1. Script Writer Agent - for content creation
+2. Visual Designer Agent - for graphics and thumbnails
+3. Video Editor Agent - for timeline and effects
+4. SEO Optimizer Agent - for discoverability
+5. Quality Assurance Agent - for final review
+
+For each agent, specify:
+- Exact tasks and deliverables
+- Input requirements and dependencies
+- Success criteria and quality metrics
+- Handoff procedures between agents
+
+Optimize for efficiency and quality while managing dependencies.
+""" + PLANNER_GRAPH_INSTRUCTIONS, """
+**Project:** {project_description}
+**Requirements:** {requirements}
+**Available Resources:** {resources}
+**Timeline:** {timeline}
+""")
+
+# Criteria, audience and platform come before the content so a batch sharing them
+# also shares a longer cached prefix
+prompt_registry.register("evaluate-content", 1, """
+Formatting re-enabled
+
+Act as an expert content evaluator and judge video content. The evaluation criteria, audience, platform and the content itself follow in the user message.
+
+Provide comprehensive evaluation including:
+1. Detailed scoring (1-10) for each criterion
+2. Specific strengths and weaknesses
+3. Improvement recommendations
+4. Comparison to industry benchmarks
+5. Predicted performance metrics
+6. Risk assessment and mitigation strategies
+
+Use objective analysis and provide actionable feedback.
+""", """
+**Evaluation Criteria:** {criteria}
+**Target Audience:** {audience}
+**Platform:** {platform}
+**Content Type:** {content_type}
+**Content to Evaluate:** {content}
+""")
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi import HTTPException
+
+from monitoring import logger
+
+# Async reasoning job configuration
+REASONING_JOBS_CONFIG = {
+    "workers": int(os.getenv("REASONING_JOB_WORKERS", "8")),
+    "max_queue_size": int(os.getenv("REASONING_JOB_MAX_QUEUE", "500")),
+    "result_ttl": int(os.getenv("REASONING_JOB_RESULT_TTL", "86400")),  # 24 hours
+    "local_max_jobs": 5000,
+    "key_prefix": "reasoning_job"
+}
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class ReasoningJobQueue:
+    """Queue long-running reasoning tasks and run them on a bounded worker pool.
+
+    Job state lives in Redis when available so any worker can answer polls;
+    otherwise it is kept in process.
+    """
+
+    def __init__(self, config: Dict[str, Any] = REASONING_JOBS_CONFIG):
+        self.config = config
+        self.redis = None
+        self.handlers: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._local_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._updates: Dict[str, Set[asyncio.Event]] = {}  # One event per subscriber, per job
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection for job state"""
+        self.redis = redis_client
+
+    def register(self, task: str, handler: Callable[..., Awaitable[Dict[str, Any]]]):
+        """Make a reasoning handler available as a job task"""
+        self.handlers[task] = handler
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.config['key_prefix']}:{job_id}"
+
+    async def start(self):
+        """Start the worker pool"""
+        self._queue = asyncio.Queue(maxsize=self.config["max_queue_size"])
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(self.config["workers"])
+        ]
+        logger.info(f"Reasoning job workers started: {self.config['workers']}")
+
+    async def stop(self):
+        """Stop the worker pool; queued jobs that never started are marked failed"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while self._queue is not None and not self._queue.empty():
+            job_id, _, _, _ = self._queue.get_nowait()
+            job = await self.get(job_id)
+            if job:
+                job.update(status="failed", error="Server shutting down before the job started")
+                await self._save(job)
+
+    async def submit(self, task: str, payload: dict, caller: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Enqueue a task and return its job record immediately. caller (plan and user id) is passed to the handler."""
+        if task not in self.handlers:
+            raise HTTPException(status_code=400, detail=f"Unknown reasoning task: {task}")
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Reasoning job workers are not running")
+
+        caller = caller or {"plan": "free", "user_id": None}
+        job = {
+            "id": str(uuid.uuid4()),
+            "task": task,
+            "status": "queued",
+            "user_id": caller.get("user_id"),
+            "plan": caller.get("plan"),
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "completed_at": None
+        }
+
+        try:
+            self._queue.put_nowait((job["id"], task, {**payload, "stream": False}, caller))
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Reasoning job queue is full, please retry shortly",
+                headers={"Retry-After": "30"}
+            )
+
+        await self._save(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job record"""
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._key(job_id))
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"Reasoning job lookup failed: {str(e)}")
+        job = self._local_jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def wait_for_update(self, job_id: str, timeout: float):
+        """Wait until this worker updates the job, or the timeout passes"""
+        event = asyncio.Event()
+        subscribers = self._updates.setdefault(job_id, set())
+        subscribers.add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            subscribers.discard(event)
+            if not subscribers and self._updates.get(job_id) is subscribers:
+                del self._updates[job_id]
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _save(self, job: Dict[str, Any]):
+        saved = False
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._key(job["id"]), json.dumps(job, default=str), ex=self.config["result_ttl"])
+                saved = True
+            except Exception as e:
+                logger.warning(f"Reasoning job save failed, keeping it in process: {str(e)}")
+        if not saved:
+            self._local_jobs[job["id"]] = job
+            self._local_jobs.move_to_end(job["id"])
+            while len(self._local_jobs) > self.config["local_max_jobs"]:
+                self._local_jobs.popitem(last=False)
+
+        for event in self._updates.get(job["id"], ()):
+            event.set()
+
+    async def _worker(self, worker_number: int):
+        while True:
+            job_id, task, payload, caller = await self._queue.get()
+            try:
+                await self._run(job_id, task, payload, caller)
+            except Exception as e:
+                logger.error(f"Reasoning job worker {worker_number} crashed on {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, task: str, payload: dict, caller: Dict[str, Any]):
+        job = await self.get(job_id) or {"id": job_id, "task": task}
+        job.update(status="running", started_at=datetime.utcnow().isoformat())
+        await self._save(job)
+
+        try:
+            result = await self.handlers[task](payload, caller=caller)
+            job.update(status="completed", result=result)
+        except HTTPException as e:
+            job.update(status="failed", error=e.detail)
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+
+        job["completed_at"] = datetime.utcnow().isoformat()
+        await self._save(job)
+
+
+# Global instance
+reasoning_jobs = ReasoningJobQueue()
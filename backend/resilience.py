@@ -0,0 +1,285 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import openai
+from fastapi import HTTPException
+
+from monitoring import logger
+
+# Upstream resilience configuration
+RESILIENCE_CONFIG = {
+    "failure_threshold": int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5")),  # Consecutive failures that open the breaker
+    "open_seconds": float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30")),
+    "retry_attempts": int(os.getenv("AI_RETRY_ATTEMPTS", "2")),
+    "retry_base_delay": float(os.getenv("AI_RETRY_BASE_DELAY", "0.5")),
+    "retry_max_delay": float(os.getenv("AI_RETRY_MAX_DELAY", "8")),
+    "hedge_enabled": os.getenv("AI_HEDGE_ENABLED", "true").lower() == "true",
+    "hedge_efforts": ("none", "minimal", "low"),  # Only cheap calls are worth duplicating
+    "hedge_min_samples": 20,  # Latencies needed before the p95 is trusted
+    "hedge_max_in_flight": int(os.getenv("AI_HEDGE_MAX_IN_FLIGHT", "8"))
+}
+
+RETRIABLE_ERRORS = (
+    openai.APIConnectionError,  # Includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+
+class CircuitBreaker:
+    """Per-model breaker: closed until failure_threshold consecutive failures, then open for
+    open_seconds, then half-open with a single probe call deciding whether to close again."""
+
+    def __init__(self, model: str, config: Dict[str, Any]):
+        self.model = model
+        self.config = config
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def retry_after(self) -> int:
+        return max(int(self.opened_at + self.config["open_seconds"] - time.time()) + 1, 1)
+
+    def before_call(self):
+        """Raise 503 while open; in half-open let exactly one probe through"""
+        if self.state == "open":
+            if time.time() - self.opened_at < self.config["open_seconds"]:
+                self._reject()
+            self.state = "half_open"
+            logger.info(f"AI circuit breaker for {self.model} half-open, probing upstream")
+
+        if self.state == "half_open":
+            if self.probe_in_flight:
+                self._reject()
+            self.probe_in_flight = True
+
+    def _reject(self):
+        raise HTTPException(
+            status_code=503,
+            detail=f"{self.model} is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"AI circuit breaker for {self.model} closed")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.config["failure_threshold"]:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(f"AI circuit breaker for {self.model} opened after {self.consecutive_failures} failures")
+            self.state = "open"
+            self.opened_at = time.time()
+
+    def get_state(self) -> Dict[str, Any]:
+        state = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened
+        }
+        if self.state == "open":
+            state["retry_after"] = self.retry_after()
+        return state
+
+
+class ResilientCaller:
+    """Circuit breaking, jittered retries and hedged requests around upstream AI calls"""
+
+    def __init__(self, config: Dict[str, Any] = RESILIENCE_CONFIG):
+        self.config = config
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, deque] = {}
+        self._hedges_in_flight = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+        self.retries = 0
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(model, self.config)
+        return self.breakers[model]
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        ceiling = min(self.config["retry_base_delay"] * (2 ** attempt), self.config["retry_max_delay"])
+        return random.uniform(0, ceiling)
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        latencies = self._latencies.get(model)
+        if not latencies or len(latencies) < self.config["hedge_min_samples"]:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def _record_latency(self, model: str, latency: float):
+        self._latencies.setdefault(model, deque(maxlen=500)).append(latency)
+
+    async def call(
+        self,
+        model: str,
+        fn: Callable[[], Awaitable[Any]],
+        hedge: Optional[Callable[[], Optional[Awaitable[Any]]]] = None
+    ) -> Any:
+        """Run fn through the model's breaker, retrying retriable errors with jittered backoff.
+
+        hedge, when given, starts the duplicate request of a hedge, or returns None to skip it.
+        """
+        breaker = self.breaker(model)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            started = time.time()
+            try:
+                if hedge is not None and self.config["hedge_enabled"]:
+                    result = await self._hedged(model, fn, hedge)
+                else:
+                    result = await fn()
+            except RETRIABLE_ERRORS as e:
+                breaker.record_failure()
+                if attempt >= self.config["retry_attempts"] or breaker.state == "open":
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"Retrying {model} call in {delay:.2f}s after {type(e).__name__}")
+                await asyncio.sleep(delay)
+                continue
+            except openai.APIStatusError:
+                # Client errors (bad request, auth) say nothing about upstream health
+                breaker.record_success()
+                raise
+            except BaseException:
+                # Cancelled or failed before upstream answered; free a half-open probe slot
+                breaker.probe_in_flight = False
+                raise
+
+            breaker.record_success()
+            self._record_latency(model, time.time() - started)
+            return result
+
+    async def _hedged(self, model: str, fn: Callable[[], Awaitable[Any]], hedge: Callable[[], Optional[Awaitable[Any]]]) -> Any:
+        """Send a duplicate request if the first has not answered by the model's p95 latency.
+
+        The losing request is left to finish so its usage is accounted for; it counts towards
+        hedge_max_in_flight until it does.
+        """
+        delay = self._hedge_delay(model)
+        if delay is None or self._hedges_in_flight >= self.config["hedge_max_in_flight"]:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        duplicate = hedge()
+        if duplicate is None:
+            # No budget for a second request
+            self.hedges_skipped += 1
+            return await primary
+
+        self._hedges_in_flight += 1
+        self.hedges_sent += 1
+        second = asyncio.ensure_future(duplicate)
+        settled = False
+        try:
+            pending = {primary, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedges_won += 1
+                        settled = True
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            if not settled:
+                for task in (primary, second):
+                    task.cancel()
+            self._release_hedge(primary, second)
+
+    def _release_hedge(self, *tasks: asyncio.Future):
+        """Free the hedge slot once every request of the hedge has finished"""
+        remaining = [task for task in tasks if not task.done()]
+        if not remaining:
+            self._hedges_in_flight -= 1
+            return
+
+        def finished(task: asyncio.Future):
+            if not task.cancelled():
+                task.exception()  # The loser's failure has nobody left to report to
+            remaining.remove(task)
+            if not remaining:
+                self._hedges_in_flight -= 1
+
+        for task in remaining:
+            task.add_done_callback(finished)
+
+    async def stream(self, model: str, open_stream: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Stream through the breaker. Retries only happen before the first event reaches the client."""
+        breaker = self.breaker(model)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            received = False
+            try:
+                async with aclosing(open_stream()) as events:
+                    async for event in events:
+                        received = True
+                        yield event
+            except RETRIABLE_ERRORS as e:
+                breaker.record_failure()
+                if received or attempt >= self.config["retry_attempts"] or breaker.state == "open":
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"Retrying {model} stream in {delay:.2f}s after {type(e).__name__}")
+                await asyncio.sleep(delay)
+                continue
+            except openai.APIStatusError:
+                breaker.record_success()
+                raise
+            except BaseException:
+                breaker.probe_in_flight = False
+                raise
+
+            breaker.record_success()
+            return
+
+    def health_check(self) -> Dict[str, Any]:
+        """Breaker states for /health/detailed: degraded while any model's breaker is not closed"""
+        models = {model: breaker.get_state() for model, breaker in self.breakers.items()}
+        # Open breakers shed AI load while the rest of the API keeps serving, so they degrade the
+        # instance rather than mark it unhealthy and get it pulled from the load balancer
+        open_models = sorted(model for model, state in models.items() if state["state"] != "closed")
+        return {
+            "status": "degraded" if open_models else "healthy",
+            "open_models": open_models,
+            "models": models,
+            "retries": self.retries,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "hedges_skipped": self.hedges_skipped
+        }
+
+
+# Global instance
+resilient_caller = ResilientCaller()
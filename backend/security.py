@@ -23,6 +23,8 @@ except:
 
 # Security configuration
 SECURITY_CONFIG = {
+    # Only switch off for local load tests against the offline stand-in services
+    "rate_limits_enabled": os.getenv("RATE_LIMITS_ENABLED", "true").lower() == "true",
     "rate_limits": {
         "auth": {"requests": 5, "window": 300},  # 5 requests per 5 minutes
         "ai_generation": {"requests": 10, "window": 60},  # 10 requests per minute
@@ -55,6 +57,9 @@ class RateLimiter:
         self.window = window
     
     async def __call__(self, request: Request):
+        if not SECURITY_CONFIG["rate_limits_enabled"]:
+            return True
+        
         # Get client identifier (IP + user agent hash for better uniqueness)
         client_ip = request.client.host
         user_agent = request.headers.get("user-agent", "")
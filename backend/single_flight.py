@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from monitoring import performance_monitor, logger
+
+# Request coalescing configuration
+SINGLE_FLIGHT_CONFIG = {
+    "lock_ttl_ms": int(os.getenv("AI_SINGLE_FLIGHT_LOCK_TTL_MS", "30000")),
+    "wait_timeout": float(os.getenv("AI_SINGLE_FLIGHT_WAIT_TIMEOUT", "240")),
+    "poll_interval": 1.0,
+    "key_prefix": "ai_flight"
+}
+
+
+# Delete or extend the lock only while it still holds this flight's token
+RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+REFRESH_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Coalesce identical in-flight AI calls.
+
+    Callers in the same worker share one task, which keeps running if the caller that
+    started it is cancelled. Across workers the first caller takes a short Redis lock and
+    publishes its outcome; the others subscribe and reuse its result, or fail with its error.
+    If the leader is cancelled or dies, the waiting callers elect a new leader through the lock.
+    """
+
+    def __init__(self, config: Dict[str, Any] = SINGLE_FLIGHT_CONFIG):
+        self.config = config
+        self.redis = None
+        self._release_lock = None
+        self._refresh_lock = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection (None keeps coalescing per worker)"""
+        self.redis = redis_client
+        if redis_client is not None:
+            self._release_lock = redis_client.register_script(RELEASE_LOCK)
+            self._refresh_lock = redis_client.register_script(REFRESH_LOCK)
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.config['key_prefix']}:lock:{key}"
+
+    def _channel(self, key: str) -> str:
+        return f"{self.config['key_prefix']}:done:{key}"
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]],
+        lookup: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Run fn once per key. Returns the result and whether it was shared from another caller.
+
+        lookup is consulted when another worker finished before we could subscribe to its result.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            performance_monitor.record_ai_call_coalesced()
+            result, _ = await self._wait(task)
+            return result, True
+
+        task = asyncio.create_task(self._do_distributed(key, fn, lookup))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await self._wait(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved when every caller has gone
+
+    async def _wait(self, task: asyncio.Task) -> Tuple[Dict[str, Any], bool]:
+        """Await the shared task; cancelling one caller leaves it running for the others"""
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                # The shared call itself was cancelled, not this caller
+                raise RuntimeError("Coalesced AI call was cancelled") from None
+            raise
+
+    async def _do_distributed(self, key: str, fn, lookup) -> Tuple[Dict[str, Any], bool]:
+        if self.redis is None:
+            return await fn(), False
+
+        deadline = time.time() + self.config["wait_timeout"]
+        while True:
+            token = uuid.uuid4().hex
+            try:
+                acquired = await self.redis.set(self._lock_key(key), token, nx=True, px=self.config["lock_ttl_ms"])
+            except Exception as e:
+                logger.warning(f"Single-flight lock failed, calling upstream directly: {str(e)}")
+                return await fn(), False
+
+            if acquired:
+                return await self._lead(key, token, fn), False
+
+            try:
+                outcome = await self._wait_for_outcome(key, deadline)
+            except Exception as e:
+                logger.warning(f"Single-flight wait failed, calling upstream directly: {str(e)}")
+                return await fn(), False
+
+            if outcome is not None and outcome["status"] == "ok":
+                performance_monitor.record_ai_call_coalesced()
+                return outcome["result"], True
+            if outcome is not None and outcome["status"] == "failed":
+                # Fail like the leader did rather than every follower retrying upstream at once
+                if outcome.get("status_code"):
+                    raise HTTPException(status_code=outcome["status_code"], detail=outcome["error"], headers=outcome.get("headers"))
+                raise RuntimeError(outcome["error"])
+
+            # The leader was cancelled, or its lock lapsed before we heard from it
+            result = await lookup() if lookup is not None else None
+            if result is not None:
+                performance_monitor.record_ai_call_coalesced()
+                return result, True
+            if time.time() >= deadline:
+                raise HTTPException(status_code=504, detail="Timed out waiting for an identical AI call")
+            # Loop: the lock elects one new leader among the callers still waiting
+
+    async def _lead(self, key: str, token: str, fn) -> Dict[str, Any]:
+        outcome: Dict[str, Any] = {"status": "abandoned", "result": None}
+        keep_alive = asyncio.create_task(self._keep_lock(key, token))
+        try:
+            result = await fn()
+            outcome.update(status="ok", result=result)
+            return result
+        except HTTPException as e:
+            outcome.update(status="failed", error=e.detail, status_code=e.status_code, headers=e.headers)
+            raise
+        except Exception as e:
+            outcome.update(status="failed", error=str(e))
+            raise
+        finally:
+            keep_alive.cancel()
+            try:
+                await self.redis.publish(self._channel(key), json.dumps(outcome, default=str))
+                await self._release_lock(keys=[self._lock_key(key)], args=[token])
+            except Exception as e:
+                logger.warning(f"Single-flight publish failed: {str(e)}")
+
+    async def _keep_lock(self, key: str, token: str):
+        """Extend the lock while the upstream call runs so followers keep waiting"""
+        ttl_ms = self.config["lock_ttl_ms"]
+        while True:
+            await asyncio.sleep(ttl_ms / 2000)
+            try:
+                if not await self._refresh_lock(keys=[self._lock_key(key)], args=[token, ttl_ms]):
+                    logger.warning(f"Single-flight lock for {key} expired and was taken over")
+                    return
+            except Exception as e:
+                logger.warning(f"Single-flight lock refresh failed: {str(e)}")
+
+    async def _wait_for_outcome(self, key: str, deadline: float) -> Optional[Dict[str, Any]]:
+        """The leading worker's published outcome, or None if its lock goes away first or the deadline passes"""
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(self._channel(key))
+            while time.time() < deadline:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=self.config["poll_interval"])
+                if message and message["type"] == "message":
+                    return json.loads(message["data"])
+                # The leader released the lock before we subscribed, or crashed
+                if not await self.redis.exists(self._lock_key(key)):
+                    return None
+            return None
+        finally:
+            await pubsub.aclose()
+
+
+# Global instance
+single_flight = SingleFlight()
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 # Initialize Stripe
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+stripe.api_base = os.getenv("STRIPE_API_BASE", stripe.api_base)  # Point at a stand-in server for load tests
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
 # Pricing configuration
@@ -16,6 +17,7 @@ PRICING_CONFIG = {
             "ai_calls_limit": 50,
             "render_minutes_limit": 10,
             "storage_gb_limit": 1.0,
+            "ai_priority": 2,  # Lower runs first when AI capacity is queued
             "features": ["Basic AI script generation", "Standard voiceovers", "720p rendering"]
         },
         "pro": {
@@ -24,6 +26,7 @@ PRICING_CONFIG = {
             "ai_calls_limit": 1000,
             "render_minutes_limit": 120,
             "storage_gb_limit": 10.0,
+            "ai_priority": 1,
             "features": ["Advanced AI with reasoning", "Premium voices", "4K rendering", "Priority support"]
         },
         "enterprise": {
@@ -32,6 +35,7 @@ PRICING_CONFIG = {
             "ai_calls_limit": -1,  # unlimited
             "render_minutes_limit": -1,  # unlimited
             "storage_gb_limit": 100.0,
+            "ai_priority": 0,
             "features": ["Unlimited AI usage", "Custom voices", "8K rendering", "API access", "White-label"]
         }
     },
@@ -231,3 +235,7 @@ def calculate_usage_charges(user_usage: Dict[str, Any], plan_limits: Dict[str, A
 def get_plan_limits(plan_name: str) -> Dict[str, Any]:
     """Get plan limits and features"""
     return PRICING_CONFIG['plans'].get(plan_name, PRICING_CONFIG['plans']['free'])
+
+def get_ai_priority(plan_name: Optional[str]) -> int:
+    """Queue priority for a plan's AI calls (lower runs first)"""
+    return get_plan_limits(plan_name or 'free')['ai_priority']
@@ -0,0 +1,20 @@
+"""Tests run on a throwaway SQLite database. Set TEST_POSTGRES_URL to an empty, disposable
+Postgres database to run the Postgres-only ones as well.
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Set before the app modules create their engines; never point tests at DATABASE_URL
+TEST_DATABASE = os.path.join(tempfile.mkdtemp(prefix="filmfusion-tests-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DATABASE}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DATABASE}"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["MODERATION_SCAN_INTERVAL"] = "0"
+os.environ["ADMIN_STATS_REFRESH_INTERVAL"] = "0"
@@ -0,0 +1,93 @@
+"""The admin moderation listings issue the same number of SQL statements for any page size.
+
+Every report and flag has its own project or user, owner and reporter, so a listing that
+loaded them row by row would grow with the page. The content is fetched with one query per
+content type on the page, so each page compared holds a single type: reports on projects are
+"high" severity and reports on users "low".
+"""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import event, insert
+
+import main
+from database import SessionLocal, engine, create_tables, User, Project, ContentReport, ContentFlag
+
+ROWS = 50
+
+
+def seed(rows: int) -> User:
+    """An admin; rows reports on projects, rows reports on users and rows flags on projects"""
+    run_id = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        admin = User(email=f"admin-{run_id}@example.com", username=f"admin_{run_id}", hashed_password="x", is_admin=True, role="admin")
+        db.add(admin)
+        owners = [User(email=f"owner-{run_id}-{n}@example.com", username=f"owner_{run_id}_{n}", hashed_password="x") for n in range(rows)]
+        db.add_all(owners)
+        db.flush()
+        projects = [Project(name=f"Project {n}", description="d" * 300, owner_id=owner.id) for n, owner in enumerate(owners)]
+        db.add_all(projects)
+        db.flush()
+
+        targets = [("project", project.id, "high") for project in projects] + [("user", owner.id, "low") for owner in owners]
+        db.execute(insert(ContentReport), [
+            {
+                "report_type": "user_report", "content_type": content_type, "content_id": content_id, "severity": severity,
+                "reason": "spam", "reporter_id": owners[(n + 1) % rows].id, "reviewed_by_id": admin.id
+            }
+            for n, (content_type, content_id, severity) in enumerate(targets)
+        ])
+        db.execute(insert(ContentFlag), [
+            {
+                "content_type": "project", "content_id": project.id, "flag_type": "user_flag",
+                "flag_reason": "spam", "flagged_by_user_id": owners[(n + 1) % rows].id, "reviewed_by_id": admin.id
+            }
+            for n, project in enumerate(projects)
+        ])
+        db.commit()
+        db.refresh(admin)
+        db.expunge(admin)
+        return admin
+    finally:
+        db.close()
+
+
+def list_page(handler, admin: User, limit: int, **filters):
+    """The handler's response for one page, and the statements it took"""
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    main.stats_cache.invalidate("moderation")  # Count the stats query on every page
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = asyncio.run(handler(skip=0, limit=limit, cursor=None, admin_user=admin, db=db, **filters))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        db.close()
+    return response, statements
+
+
+@pytest.fixture(scope="module")
+def admin():
+    create_tables()
+    return seed(ROWS)
+
+
+@pytest.mark.parametrize("handler, key, filters", [
+    (main.get_moderation_reports, "reports", {"severity": "high"}),
+    (main.get_moderation_reports, "reports", {"severity": "low"}),
+    (main.get_content_flags_list, "flags", {})
+], ids=["reports on projects", "reports on users", "flags"])
+def test_statement_count_does_not_grow_with_page_size(admin, handler, key, filters):
+    one, one_statements = list_page(handler, admin, 1, **filters)
+    full, full_statements = list_page(handler, admin, ROWS, **filters)
+
+    assert len(one[key]) == 1
+    assert len(full[key]) == ROWS
+    assert full_statements == one_statements
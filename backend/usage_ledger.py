@@ -0,0 +1,192 @@
+import asyncio
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import exc, insert
+
+from database import SessionLocal, AISession, bump_user_stats
+from monitoring import logger
+
+# AI usage ledger configuration
+USAGE_LEDGER_CONFIG = {
+    "enabled": os.getenv("AI_USAGE_LEDGER_ENABLED", "true").lower() == "true",
+    "batch_size": int(os.getenv("AI_USAGE_BATCH_SIZE", "200")),
+    "flush_interval_ms": int(os.getenv("AI_USAGE_FLUSH_INTERVAL_MS", "2000")),
+    "max_buffer": int(os.getenv("AI_USAGE_MAX_BUFFER", "20000"))
+}
+
+# USD per million tokens
+MODEL_PRICING = {
+    "gpt-5": {"input": 1.25, "cached_input": 0.125, "output": 10.00},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00}
+}
+
+
+def estimate_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    """Dollar cost of a call; reasoning tokens are billed as output tokens"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return 0.0
+    uncached = max(input_tokens - cached_tokens, 0)
+    return round(
+        (uncached * pricing["input"] + cached_tokens * pricing["cached_input"] + output_tokens * pricing["output"]) / 1_000_000,
+        6
+    )
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed write is worth retrying as is: the database was unreachable or busy, not the rows"""
+    if isinstance(error, exc.DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (exc.OperationalError, exc.InterfaceError, exc.DisconnectionError, exc.TimeoutError))
+
+
+class UsageLedger:
+    """Buffer AI usage records in memory and write them to ai_sessions in multi-row inserts.
+
+    A batch is flushed once batch_size records are waiting or flush_interval_ms has passed,
+    and whatever is left is flushed on shutdown. When the database falls behind the buffer
+    keeps the newest max_buffer records; a batch the database rejects outright is retried
+    row by row and the rows it still rejects are dropped.
+    """
+
+    def __init__(self, config: Dict[str, Any] = USAGE_LEDGER_CONFIG):
+        self.config = config
+        self._buffer: deque = deque()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def record(
+        self,
+        model: str,
+        usage: Dict[str, int],
+        latency_ms: Optional[float] = None,
+        user_id: Optional[int] = None,
+        session_type: str = "reasoning",
+        response_id: Optional[str] = None,
+        project_id: Optional[int] = None
+    ):
+        """Queue one AI call for the ledger. Never touches the database."""
+        if not self.config["enabled"]:
+            return
+
+        if len(self._buffer) >= self.config["max_buffer"]:
+            self._buffer.popleft()
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"AI usage ledger buffer full, dropped {self.dropped} records so far")
+
+        self._buffer.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "project_id": project_id,
+            "session_type": session_type,
+            "model_used": model,
+            "tokens_used": usage.get("total_tokens", 0),
+            "reasoning_tokens": usage.get("reasoning_tokens", 0),
+            "cached_tokens": usage.get("cached_tokens", 0),
+            "cost": estimate_cost(
+                model, usage.get("input_tokens", 0), usage.get("cached_tokens", 0), usage.get("output_tokens", 0)
+            ),
+            "latency_ms": latency_ms,
+            "request_data": {"input_tokens": usage.get("input_tokens", 0)},
+            "response_data": {"response_id": response_id, "output_tokens": usage.get("output_tokens", 0)},
+            "created_at": datetime.now(timezone.utc)
+        })
+
+        if self._batch_ready is not None and len(self._buffer) >= self.config["batch_size"]:
+            self._batch_ready.set()
+
+    async def start(self):
+        """Start the background flusher"""
+        self._batch_ready = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        while self._buffer:
+            if not await self.flush():
+                break
+
+    async def _flush_loop(self):
+        interval = self.config["flush_interval_ms"] / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            while self._buffer:
+                if not await self.flush() or len(self._buffer) < self.config["batch_size"]:
+                    break
+
+    async def flush(self) -> bool:
+        """Write up to one batch. Returns False if the write failed (the batch is put back)."""
+        batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.config["batch_size"]))]
+        if not batch:
+            return True
+
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.written += len(batch)
+            return True
+        except Exception as e:
+            if not is_transient(e):
+                logger.warning(f"AI usage ledger batch of {len(batch)} records rejected, writing them one at a time: {str(e)}")
+                return await self._write_rows(batch)
+            logger.error(f"AI usage ledger flush failed for {len(batch)} records: {str(e)}")
+            self._requeue(batch)
+            return False
+
+    async def _write_rows(self, batch: List[Dict[str, Any]]) -> bool:
+        """Write records one at a time so a bad row cannot hold back the rest"""
+        for n, record in enumerate(batch):
+            try:
+                await asyncio.to_thread(self._write, [record])
+                self.written += 1
+            except Exception as e:
+                if is_transient(e):
+                    logger.error(f"AI usage ledger flush failed for {len(batch) - n} records: {str(e)}")
+                    self._requeue(batch[n:])
+                    return False
+                self.rejected += 1
+                logger.error(f"AI usage ledger dropped record {record['id']} the database rejected: {str(e)}")
+        return True
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        room = self.config["max_buffer"] - len(self._buffer)
+        kept = batch[-room:] if room > 0 else []
+        self._buffer.extendleft(reversed(kept))
+        self.dropped += len(batch) - len(kept)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            db.execute(insert(AISession), batch)
+            per_user: Dict[Optional[int], List[int]] = {}
+            for record in batch:
+                totals = per_user.setdefault(record.get("user_id"), [0, 0])
+                totals[0] += 1
+                totals[1] += record.get("tokens_used") or 0
+            for user_id, (calls, tokens) in per_user.items():
+                bump_user_stats(db, user_id, ai_calls=calls, tokens_used=tokens)
+            db.commit()
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"buffered": len(self._buffer), "written": self.written, "dropped": self.dropped, "rejected": self.rejected}
+
+
+# Global instance
+usage_ledger = UsageLedger()
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from database import SessionLocal, reconcile_user_stats
+from monitoring import logger
+
+# user_stats reconciliation configuration
+USER_STATS_CONFIG = {
+    "reconcile_interval": int(os.getenv("USER_STATS_RECONCILE_INTERVAL", "3600")),  # Seconds between runs, 0 disables
+    "page_size": int(os.getenv("USER_STATS_RECONCILE_PAGE_SIZE", "500"))
+}
+
+
+class UserStatsReconciler:
+    """Periodically recount the user_stats rollup from the source tables and repair drift"""
+
+    def __init__(self, config: Dict[str, Any] = USER_STATS_CONFIG):
+        self.config = config
+        self.redis = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def bind_redis(self, redis_client):
+        """Use the application's asyncio Redis connection to elect the reconciling worker"""
+        self.redis = redis_client
+
+    def reconcile_all(self) -> Dict[str, Any]:
+        """Walk every user in id order, one page per transaction"""
+        started = time.time()
+        checked = repaired = 0
+        after_user_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                page = reconcile_user_stats(db, after_user_id, self.config["page_size"])
+                checked += page["checked"]
+                repaired += page["repaired"]
+                if page["last_user_id"] is None or page["checked"] < self.config["page_size"]:
+                    break
+                after_user_id = page["last_user_id"]
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.last_run = {
+            "checked_count": checked,
+            "repaired_count": repaired,
+            "duration_seconds": round(time.time() - started, 2),
+            "finished_at": time.time()
+        }
+        if repaired:
+            logger.warning(f"user_stats reconcile repaired {repaired} of {checked} users")
+        return self.last_run
+
+    async def start(self):
+        """Start the periodic reconcile"""
+        if self.config["reconcile_interval"] > 0:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.config["reconcile_interval"])
+            if not await self._take_lock():
+                continue
+            try:
+                await asyncio.to_thread(self.reconcile_all)
+            except Exception as e:
+                logger.error(f"user_stats reconcile failed: {str(e)}")
+
+    async def _take_lock(self) -> bool:
+        """Only one worker reconciles per interval"""
+        if self.redis is None:
+            return True
+        try:
+            return bool(await self.redis.set("user_stats_reconcile:lock", "1", nx=True, ex=max(int(self.config["reconcile_interval"]) - 1, 1)))
+        except Exception as e:
+            logger.warning(f"user_stats reconcile lock failed, reconciling anyway: {str(e)}")
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"reconcile_interval": self.config["reconcile_interval"], "last_run": self.last_run}
+
+
+# Global instance
+user_stats_reconciler = UserStatsReconciler()